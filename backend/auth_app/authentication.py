@@ -0,0 +1,101 @@
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from students.models import Student
+from tutors.models import Tutor
+
+from .profiles import PROFILE_RELATIONS
+from .revocation import is_revoked
+from .tokens import USER_CLAIMS
+
+PROFILE_MODELS = {'tutor': Tutor, 'student': Student}
+
+
+class ProfileJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that loads the user together with their Tutor or
+    Student profile in one query, so `request.profile` and
+    `hasattr(user, 'tutor')` checks don't go back to the database.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = self.user_model.objects.select_related(*PROFILE_RELATIONS).get(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+def _read_only(*args, **kwargs):
+    raise NotImplementedError("Instances built from token claims can't be saved or deleted; fetch the row first.")
+
+
+def _from_claims(model, db, **values):
+    # Fields without a value are deferred and load on first access. Saving
+    # would write the claims back over newer values, so it is blocked.
+    field_names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    instance = model.from_db(db, field_names, [values[name] for name in field_names])
+    instance.save = instance.delete = _read_only
+    return instance
+
+
+class StatelessProfileJWTAuthentication(ProfileJWTAuthentication):
+    """
+    Authenticates from the claims of a ProfileRefreshToken without a query.
+    The user and Tutor/Student profile are real, read-only model instances
+    holding their ids, username, email and is_staff, so ORM filters,
+    isinstance checks, `request.profile` and IsAdminUser work as usual;
+    any other field is fetched the first time it is read.
+
+    Tokens missing any of those claims (issued before a profile existed)
+    are authenticated from the database. Every request checks the cache
+    for a revoked token or user, since is_active is never re-read.
+    """
+
+    def get_user(self, validated_token):
+        if is_revoked(validated_token):
+            raise AuthenticationFailed(_("Token has been revoked."), code="token_revoked")
+
+        role = validated_token.get('role')
+        if role not in PROFILE_MODELS or validated_token.get('profile_id') is None or any(
+            claim not in validated_token for claim in USER_CLAIMS
+        ):
+            return super().get_user(validated_token)
+
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, ValueError) as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        db = router.db_for_read(self.user_model)
+        # Tokens are only issued to active users; deactivation revokes them.
+        user = _from_claims(
+            self.user_model, db, id=user_id, is_active=True,
+            **{claim: validated_token[claim] for claim in USER_CLAIMS},
+        )
+        profile_model = PROFILE_MODELS[role]
+        profile = _from_claims(profile_model, db, id=validated_token['profile_id'], user_id=user_id)
+
+        profile_model._meta.get_field('user').set_cached_value(profile, user)
+        for relation in PROFILE_RELATIONS:
+            self.user_model._meta.get_field(relation).set_cached_value(user, profile if relation == role else None)
+        return user
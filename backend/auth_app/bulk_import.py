@@ -0,0 +1,172 @@
+import csv
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import IntegrityError, transaction
+
+from students.models import Student
+from students.serializers import StudentRegisterSerializer
+from tutors.models import Tutor
+from tutors.serializers import TutorAddSerializer
+
+from .serializers import RegisterSerializer
+
+USER_COLUMNS = ['username', 'email', 'password', 'first_name', 'last_name']
+PROFILES = {
+    'student': (Student, StudentRegisterSerializer, ['grade', 'school_name']),
+    'tutor': (Tutor, TutorAddSerializer, ['subject', 'description']),
+}
+INSERT_BATCH_SIZE = 500
+LOOKUP_CHUNK_SIZE = 1000
+
+
+class TooManyRows(ValueError):
+    def __init__(self, max_rows):
+        super().__init__(f"At most {max_rows} rows can be imported at once.")
+
+
+class ImportUserSerializer(RegisterSerializer):
+    # Uniqueness is checked for the whole file at once in validate_rows.
+    class Meta(RegisterSerializer.Meta):
+        extra_kwargs = {'username': {'validators': [UnicodeUsernameValidator()]}}
+
+
+def required_columns(role):
+    return USER_COLUMNS + PROFILES[role][2]
+
+
+def validate_rows(rows, role):
+    """
+    Validates every CSV row with the registration serializers, without a
+    query per row. Returns (valid, errors): valid is a list of
+    (user_data, profile_data) and errors lists {line, username, errors}
+    for every rejected row. Line numbers count the header as line 1.
+    """
+    _model, profile_serializer, profile_columns = PROFILES[role]
+    valid, errors, lines = [], [], {}
+    for line, row in enumerate(rows, start=2):
+        user = ImportUserSerializer(data={column: row.get(column) for column in USER_COLUMNS})
+        profile = profile_serializer(data={column: row.get(column) for column in profile_columns})
+        row_errors = {}
+        if not user.is_valid():
+            row_errors.update(user.errors)
+        if not profile.is_valid():
+            row_errors.update(profile.errors)
+        username = row.get('username')
+        if username in lines:
+            row_errors.setdefault('username', []).append(f"Duplicate of line {lines[username]}.")
+        elif username:
+            lines[username] = line
+        if row_errors:
+            errors.append({'line': line, 'username': username, 'errors': row_errors})
+        else:
+            valid.append((line, user.validated_data, profile.validated_data))
+
+    usernames = list(lines)
+    taken = set()
+    for start in range(0, len(usernames), LOOKUP_CHUNK_SIZE):
+        taken.update(User.objects.filter(
+            username__in=usernames[start:start + LOOKUP_CHUNK_SIZE],
+        ).values_list('username', flat=True))
+    for line, user_data, _profile_data in valid:
+        if user_data['username'] in taken:
+            errors.append({'line': line, 'username': user_data['username'],
+                           'errors': {'username': ["A user with that username already exists."]}})
+
+    errors.sort(key=lambda error: error['line'])
+    rejected = {error['line'] for error in errors}
+    return [(user_data, profile_data) for line, user_data, profile_data in valid if line not in rejected], errors
+
+
+def _available_cpus():
+    # The affinity mask reflects container CPU limits where cpu_count() doesn't.
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _pool_context():
+    # Forking a process that may be running server threads or holding
+    # database connections is unsafe; fresh interpreters only import the
+    # hasher and read settings from DJANGO_SETTINGS_MODULE.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hashes with the default password hasher in a process pool: each hash is
+    deliberately slow, so a large import is CPU-bound and benefits from
+    every core rather than one thread.
+    """
+    workers = workers or settings.USER_IMPORT_HASH_WORKERS or _available_cpus()
+    if workers == 1 or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as executor:
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+
+def import_users(rows, role, dry_run=False, workers=None):
+    """
+    Registers every row of a student or tutor CSV, or none of them: if any
+    row is invalid only the error report is returned. Users and profiles
+    are inserted with bulk_create, so post_save receivers don't run; new
+    accounts belong to no classroom or conversation yet, so no cache needs
+    dropping.
+    """
+    valid, errors = validate_rows(rows, role)
+    report = {'created': 0, 'errors': errors}
+    if errors or dry_run or not valid:
+        return report
+
+    hashes = hash_passwords([user_data['password'] for user_data, _profile_data in valid], workers)
+    users = [
+        User(**{**user_data, 'password': password_hash})
+        for (user_data, _profile_data), password_hash in zip(valid, hashes)
+    ]
+    model = PROFILES[role][0]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=INSERT_BATCH_SIZE)
+            if any(user.pk is None for user in users):
+                # Backends that can't return ids from a bulk insert.
+                ids = dict(User.objects.filter(
+                    username__in=[user.username for user in users],
+                ).values_list('username', 'id'))
+                for user in users:
+                    user.pk = ids[user.username]
+            model.objects.bulk_create(
+                [model(user=user, **profile_data) for user, (_user_data, profile_data) in zip(users, valid)],
+                batch_size=INSERT_BATCH_SIZE,
+            )
+    except IntegrityError:
+        # Someone registered one of the usernames since validation ran.
+        report['errors'] = [{'line': None, 'username': None,
+                             'errors': {'non_field_errors': ["A username was taken during the import; nothing was created."]}}]
+        return report
+    report['created'] = len(users)
+    return report
+
+
+def read_csv(text_stream, role, max_rows=None):
+    """
+    Returns the rows of a CSV stream. Raises ValueError on missing columns or
+    more than `max_rows` rows (default USER_IMPORT_MAX_ROWS).
+    """
+    max_rows = max_rows or settings.USER_IMPORT_MAX_ROWS
+    reader = csv.DictReader(text_stream)
+    missing = [column for column in required_columns(role) if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    rows = []
+    for row in reader:
+        if len(rows) == max_rows:
+            raise TooManyRows(max_rows)
+        rows.append(row)
+    return rows
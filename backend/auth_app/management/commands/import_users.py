@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from auth_app.bulk_import import import_users, read_csv
+
+
+class Command(BaseCommand):
+    help = "Registers every student or tutor in a CSV file, or none of them if any row is invalid."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--role', choices=['student', 'tutor'], required=True)
+        parser.add_argument('--dry-run', action='store_true', help="Only validate the file.")
+        parser.add_argument('--workers', type=int, help="Password hashing processes (default USER_IMPORT_HASH_WORKERS).")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as source:
+                rows = read_csv(source, options['role'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        report = import_users(rows, options['role'], dry_run=options['dry_run'], workers=options['workers'])
+        if report['errors']:
+            for error in report['errors']:
+                self.stderr.write(f"line {error['line']} ({error['username']}): {json.dumps(error['errors'])}")
+            raise CommandError(f"{len(report['errors'])} invalid rows; nothing was imported.")
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"All {len(rows)} rows are valid."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Created {report['created']} {options['role']}s."))
@@ -0,0 +1,22 @@
+from django.utils.functional import SimpleLazyObject
+
+from .profiles import get_profile
+
+
+class RequestProfileMiddleware:
+    """
+    Sets `request.profile` to the authenticated user's Tutor or Student
+    profile, resolved on first access and reused for the rest of the
+    request. It is falsy for anonymous users and users without a profile,
+    so test it with `isinstance` or truthiness rather than `is None`.
+
+    DRF views see it too: their Request falls back to the HttpRequest, whose
+    `user` DRF replaces once the JWT is authenticated.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.profile = SimpleLazyObject(lambda: get_profile(request.user))
+        return self.get_response(request)
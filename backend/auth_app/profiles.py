@@ -0,0 +1,18 @@
+from django.core.exceptions import ObjectDoesNotExist
+
+PROFILE_RELATIONS = ('tutor', 'student')
+
+
+def get_profile(user):
+    """
+    Returns the user's Tutor or Student profile, or None. Free when the user
+    was loaded by ProfileJWTAuthentication, which joins both relations.
+    """
+    if user is None or not user.is_authenticated:
+        return None
+    for relation in PROFILE_RELATIONS:
+        try:
+            return getattr(user, relation)
+        except ObjectDoesNotExist:
+            continue
+    return None
@@ -0,0 +1,39 @@
+import time
+
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings
+
+
+def _jti_key(jti):
+    return f"auth_revoked_jti_{jti}"
+
+
+def _user_key(user_id):
+    return f"auth_revoked_user_{user_id}"
+
+
+def revoke_token(token):
+    """Revokes one token until it would have expired anyway."""
+    remaining = int(token['exp'] - time.time())
+    if remaining > 0:
+        cache.set(_jti_key(token[api_settings.JTI_CLAIM]), True, timeout=remaining)
+
+
+def revoke_user_tokens(user_id):
+    """
+    Revokes every token issued to the user so far. Kept as long as a
+    refresh token lives, after which all of them have expired. `iat` has
+    whole-second precision, so tokens issued later in the same second
+    (a fresh login right after logging out everywhere) stay valid.
+    """
+    cache.set(_user_key(user_id), int(time.time()), timeout=int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()))
+
+
+def is_revoked(token):
+    jti_key = _jti_key(token[api_settings.JTI_CLAIM])
+    user_key = _user_key(token[api_settings.USER_ID_CLAIM])
+    found = cache.get_many([jti_key, user_key])
+    if found.get(jti_key):
+        return True
+    revoked_after = found.get(user_key)
+    return revoked_after is not None and token.get('iat', 0) < revoked_after
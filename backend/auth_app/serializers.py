@@ -1,7 +1,22 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from students.serializers import StudentRegisterSerializer
 from tutors.serializers import TutorAddSerializer
+from .revocation import is_revoked
+from .tokens import ProfileRefreshToken
+
+
+class ProfileTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ProfileRefreshToken
+
+
+class ProfileTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        if is_revoked(self.token_class(attrs['refresh'])):
+            raise AuthenticationFailed("Token has been revoked.", code="token_revoked")
+        return super().validate(attrs)
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -62,3 +77,9 @@ class RoleBasedUserSerializer(serializers.Serializer):
 
 
     
+
+
+class UserImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    role = serializers.ChoiceField(choices=['student', 'tutor'])
+    dry_run = serializers.BooleanField(default=False)
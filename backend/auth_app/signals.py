@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .revocation import revoke_user_tokens
+from .tokens import USER_CLAIMS
+
+# Tokens copy these fields, so changing one of them revokes the old tokens.
+TOKEN_FIELDS = ('is_active', *USER_CLAIMS)
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._token_fields_changed = False
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(TOKEN_FIELDS):
+        # Logins only save last_login.
+        return
+    old = User.objects.filter(pk=instance.pk).values(*TOKEN_FIELDS).first()
+    instance._token_fields_changed = old is not None and any(
+        old[field] != getattr(instance, field) for field in TOKEN_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw=False, **kwargs):
+    # Stateless authentication never re-reads the user, so deactivating a
+    # user or changing a claimed field has to revoke the tokens they hold.
+    if not raw and (not instance.is_active or getattr(instance, '_token_fields_changed', False)):
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
@@ -1,3 +1,212 @@
-from django.test import TestCase
+import io
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.testing import LOCMEM_CACHE
+from students.models import Student
+from tutors.models import Tutor
+
+from . import bulk_import
+from .authentication import StatelessProfileJWTAuthentication
+from .bulk_import import TooManyRows, import_users, read_csv, validate_rows
+from .revocation import is_revoked, revoke_user_tokens
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@override_settings(CACHES=LOCMEM_CACHE, PASSWORD_HASHERS=FAST_HASHERS)
+class StatelessAuthTests(TestCase):
+    def setUp(self):
+        # Revocations outlive the rolled back users whose ids get reused.
+        cache.clear()
+        self.user = User.objects.create_user('tutor', email='tutor@example.com', password='pw')
+        self.tutor = Tutor.objects.create(user=self.user, subject='MATH', description='')
+
+    def login(self, user=None):
+        response = APIClient().post('/api/auth/login/', {'username': (user or self.user).username, 'password': 'pw'})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def a_second_later(self):
+        # Revocation covers tokens issued before the current second.
+        return mock.patch('auth_app.revocation.time.time', return_value=time.time() + 1)
+
+    def client_for(self, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return client
+
+    def test_claims(self):
+        token = AccessToken(self.login()['access'])
+        self.assertEqual(token['username'], 'tutor')
+        self.assertEqual(token['email'], 'tutor@example.com')
+        self.assertIs(token['is_staff'], False)
+        self.assertEqual(token['role'], 'tutor')
+        self.assertEqual(token['profile_id'], self.tutor.pk)
+
+    def test_me_without_queries(self):
+        client = self.client_for(self.login()['access'])
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/auth/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'username': 'tutor', 'email': 'tutor@example.com', 'user_id': self.user.pk})
+        self.assertEqual(len(queries), 0)
+
+    def test_staff_check_without_queries(self):
+        client = self.client_for(self.login()['access'])
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post('/api/auth/register/bulk/')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(len(queries), 0)
+
+    def test_claims_user_is_read_only(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f"Bearer {self.login()['access']}")
+        user, _token = StatelessProfileJWTAuthentication().authenticate(request)
+        self.assertIsInstance(user.tutor, Tutor)
+        with self.assertRaises(NotImplementedError):
+            user.save()
+        with self.assertRaises(NotImplementedError):
+            user.tutor.save()
+
+    def test_token_without_profile_claims_uses_database(self):
+        token = AccessToken.for_user(self.user)
+        response = self.client_for(str(token)).get('/api/auth/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], 'tutor@example.com')
+
+    def test_logout_revokes_access_and_refresh(self):
+        tokens = self.login()
+        client = self.client_for(tokens['access'])
+        self.assertEqual(client.post('/api/auth/logout/', {'refresh': tokens['refresh']}).status_code, 205)
+        self.assertEqual(client.get('/api/auth/me/').status_code, 401)
+        refresh = APIClient().post('/api/auth/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(refresh.status_code, 401)
+
+    def test_logout_everywhere(self):
+        first, second = self.login(), self.login()
+        with self.a_second_later():
+            self.client_for(first['access']).post('/api/auth/logout/', {'all': True}, format='json')
+        self.assertEqual(self.client_for(second['access']).get('/api/auth/me/').status_code, 401)
+
+    def test_login_in_the_same_second_survives_logout_everywhere(self):
+        now = int(time.time())
+        with mock.patch('auth_app.revocation.time.time', return_value=now + 0.9):
+            revoke_user_tokens(self.user.pk)
+        self.assertFalse(is_revoked({'jti': 'x', 'user_id': self.user.pk, 'iat': now}))
+        self.assertTrue(is_revoked({'jti': 'x', 'user_id': self.user.pk, 'iat': now - 1}))
+
+    def test_deactivation_revokes(self):
+        client = self.client_for(self.login()['access'])
+        self.user.is_active = False
+        with self.a_second_later():
+            self.user.save()
+        self.assertEqual(client.get('/api/auth/me/').status_code, 401)
+
+    def test_promotion_to_staff_revokes(self):
+        client = self.client_for(self.login()['access'])
+        self.user.is_staff = True
+        with self.a_second_later():
+            self.user.save()
+        self.assertEqual(client.get('/api/auth/me/').status_code, 401)
+
+    def test_login_does_not_revoke(self):
+        client = self.client_for(self.login()['access'])
+        with self.a_second_later():
+            self.login()
+        self.assertEqual(client.get('/api/auth/me/').status_code, 200)
+
+
+def student_csv(rows, header=('username', 'email', 'password', 'first_name', 'last_name', 'grade', 'school_name')):
+    lines = [','.join(header)] + [','.join(str(value) for value in row) for row in rows]
+    return io.StringIO('\n'.join(lines) + '\n')
+
+
+def student_row(username, **overrides):
+    row = {'username': username, 'email': f'{username}@example.com', 'password': 'Secret123!',
+           'first_name': 'First', 'last_name': 'Last', 'grade': 7, 'school_name': 'School'}
+    row.update(overrides)
+    return list(row.values())
+
+
+@override_settings(CACHES=LOCMEM_CACHE, PASSWORD_HASHERS=FAST_HASHERS, USER_IMPORT_HASH_WORKERS=1)
+class UserImportTests(TestCase):
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(ValueError, 'Missing columns: grade, school_name'):
+            read_csv(student_csv([], header=('username', 'email', 'password', 'first_name', 'last_name')), 'student')
+
+    def test_row_limit(self):
+        with self.assertRaises(TooManyRows):
+            read_csv(student_csv([student_row(f's{i}') for i in range(3)]), 'student', max_rows=2)
+
+    def test_validation_reports_every_bad_row(self):
+        User.objects.create_user('taken')
+        rows = read_csv(student_csv([
+            student_row('ok'),
+            student_row('ok'),
+            student_row('taken'),
+            student_row('bad', email='nope', grade='x'),
+        ]), 'student')
+        valid, errors = validate_rows(rows, 'student')
+        self.assertEqual([user_data['username'] for user_data, _profile in valid], ['ok'])
+        self.assertEqual([error['line'] for error in errors], [3, 4, 5])
+        self.assertIn('Duplicate of line 2.', errors[0]['errors']['username'])
+        self.assertIn('username', errors[1]['errors'])
+        self.assertEqual(set(errors[2]['errors']), {'email', 'grade'})
+
+    def test_nothing_is_created_when_a_row_is_invalid(self):
+        rows = read_csv(student_csv([student_row('a'), student_row('b', grade='x')]), 'student')
+        report = import_users(rows, 'student')
+        self.assertEqual(report['created'], 0)
+        self.assertFalse(User.objects.filter(username__in=['a', 'b']).exists())
+
+    def test_imports_users_and_profiles(self):
+        rows = read_csv(student_csv([student_row(f's{i}') for i in range(5)]), 'student')
+        self.assertEqual(import_users(rows, 'student'), {'created': 5, 'errors': []})
+        student = Student.objects.select_related('user').get(user__username='s3')
+        self.assertEqual(student.grade, 7)
+        self.assertTrue(student.user.check_password('Secret123!'))
+
+    def test_dry_run(self):
+        rows = read_csv(student_csv([student_row('a')]), 'student')
+        self.assertEqual(import_users(rows, 'student', dry_run=True)['created'], 0)
+        self.assertFalse(User.objects.filter(username='a').exists())
+
+    def test_username_taken_during_import(self):
+        rows = read_csv(student_csv([student_row('a'), student_row('b')]), 'student')
+        real_hash = bulk_import.hash_passwords
+
+        def hash_then_race(passwords, workers=None):
+            User.objects.create_user('b')
+            return real_hash(passwords, workers)
+
+        with mock.patch('auth_app.bulk_import.hash_passwords', side_effect=hash_then_race):
+            report = import_users(rows, 'student')
+        self.assertEqual(report['created'], 0)
+        self.assertFalse(User.objects.filter(username='a').exists())
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        upload = SimpleUploadedFile('students.csv', student_csv([student_row('a'), student_row('b')]).getvalue().encode())
+        response = client.post('/api/auth/register/bulk/', {'file': upload, 'role': 'student'}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+
+    @override_settings(USER_IMPORT_HTTP_MAX_ROWS=1)
+    def test_endpoint_refuses_large_files(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        upload = SimpleUploadedFile('students.csv', student_csv([student_row('a'), student_row('b')]).getvalue().encode())
+        response = client.post('/api/auth/register/bulk/', {'file': upload, 'role': 'student'}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('manage.py import_users', response.data['file'])
+        self.assertFalse(User.objects.filter(username='a').exists())
@@ -0,0 +1,24 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .profiles import get_profile
+
+# User fields copied into tokens; changing is_staff revokes issued tokens.
+USER_CLAIMS = ('username', 'email', 'is_staff')
+
+
+class ProfileRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the claims StatelessProfileJWTAuthentication
+    builds the request user from: USER_CLAIMS, role ('tutor', 'student'
+    or None) and profile_id. Access tokens minted from it copy them.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        profile = get_profile(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        token['role'] = profile._meta.model_name if profile else None
+        token['profile_id'] = profile.pk if profile else None
+        return token
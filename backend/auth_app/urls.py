@@ -1,14 +1,12 @@
 from django.urls import path
-from .views import RegisterView, MeView, RequestDataView, RoleBasedRegistrationView, CustomTokenObtainPairView
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from .views import RegisterView, MeView, RequestDataView, RoleBasedRegistrationView, CustomTokenObtainPairView, CustomTokenRefreshView, LogoutView, UserImportView
 urlpatterns = [
     path('user/register/', RegisterView.as_view(), name='register'),
     path("login/", CustomTokenObtainPairView.as_view(), name="login"),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
+    path('logout/', LogoutView.as_view(), name='logout'),
     path('me/', MeView.as_view(), name='me'),
     path('request_data/', RequestDataView.as_view()),
-    path('register/', RoleBasedRegistrationView.as_view())
+    path('register/', RoleBasedRegistrationView.as_view()),
+    path('register/bulk/', UserImportView.as_view()),
 ]
\ No newline at end of file
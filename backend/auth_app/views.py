@@ -1,15 +1,45 @@
 from django.shortcuts import render
 
 # Create your views here.
-from rest_framework import generics, permissions, views
-from .serializers import RegisterSerializer, RoleBasedUserSerializer
+from rest_framework import generics, permissions, status, views
+from rest_framework.exceptions import ValidationError
+from .serializers import RegisterSerializer, RoleBasedUserSerializer, ProfileTokenObtainPairSerializer, ProfileTokenRefreshSerializer, UserImportSerializer
+from .bulk_import import TooManyRows, import_users, read_csv
+from .revocation import revoke_token, revoke_user_tokens
+from django.conf import settings
 from django.contrib.auth.models import User
 from rest_framework.response import Response
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
+import io
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     parser_classes = [JSONParser, FormParser, MultiPartParser]
+    serializer_class = ProfileTokenObtainPairSerializer
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = ProfileTokenRefreshSerializer
+
+class LogoutView(views.APIView):
+    """
+    Revokes the access token of this request and the `refresh` token if
+    given; with `"all": true` every token issued to the user so far.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        revoke_token(request.auth)
+        refresh = request.data.get('refresh')
+        if refresh:
+            try:
+                revoke_token(RefreshToken(refresh))
+            except TokenError:
+                raise ValidationError({"refresh": "Token is invalid or expired"})
+        if request.data.get('all'):
+            revoke_user_tokens(request.user.pk)
+        return Response(status=status.HTTP_205_RESET_CONTENT)
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
@@ -38,4 +68,41 @@ class RequestDataView(views.APIView):
     
 class RoleBasedRegistrationView(generics.CreateAPIView):
     serializer_class = RoleBasedUserSerializer
-    
\ No newline at end of file
+    
+
+
+class UserImportView(views.APIView):
+    """
+    Registers a whole CSV of students or tutors (see auth_app.bulk_import
+    for the columns). Staff only. Nothing is created unless every row is
+    valid; the response lists the errors of each rejected row.
+
+    Password hashing is deliberately slow, so files over
+    USER_IMPORT_HTTP_MAX_ROWS rows are refused here and go through
+    `manage.py import_users` instead.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        payload = UserImportSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        data = payload.validated_data
+        try:
+            rows = read_csv(
+                io.TextIOWrapper(data['file'], encoding='utf-8-sig'), data['role'],
+                max_rows=settings.USER_IMPORT_HTTP_MAX_ROWS,
+            )
+        except TooManyRows as exc:
+            raise ValidationError({"file": f"{exc} Import larger files with `manage.py import_users`."})
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ValidationError({"file": str(exc)})
+
+        report = import_users(rows, data['role'], dry_run=data['dry_run'])
+        if report['errors']:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {**report, 'valid': len(rows)},
+            status=status.HTTP_200_OK if data['dry_run'] else status.HTTP_201_CREATED,
+        )
+
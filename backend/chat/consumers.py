@@ -1,8 +1,14 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from .models import Message, Conversation
+from django.utils import timezone
+from .models import Message
+from .membership import get_conversation_members
+from .persistence import message_buffer
+from . import metrics
+from core.graphql_api.cache import invalidate_conversations
 import time 
 
 class ChatConsumer(AsyncWebsocketConsumer):
@@ -42,16 +48,25 @@ class ChatConsumer(AsyncWebsocketConsumer):
         print(f"❌ User '{self.user}' disconnected from room.")
 
     async def receive(self, text_data):
+        server_receive_timestamp = int(time.time() * 1000)
         data = json.loads(text_data)
         message = data['message']
-        
-        # --- Latency Measurement Addition ---
-        client_send_timestamp = data.get('client_send_timestamp') # Get timestamp from client
-        server_receive_timestamp = int(time.time() * 1000) # Server receives message
-        # --- End Latency Measurement Addition ---
 
-        await self.save_message(self.profile, self.conversation_id, message)
-        
+        # Client clocks can be skewed, so only trust this stage in aggregate.
+        client_send_timestamp = data.get('client_send_timestamp')
+        if isinstance(client_send_timestamp, (int, float)):
+            metrics.observe('receive', server_receive_timestamp - client_send_timestamp)
+
+        # Stamp the message on receipt so write-behind batches keep the
+        # order messages actually arrived in.
+        received_at = timezone.now()
+
+        if not settings.CHAT_WRITE_BEHIND:
+            started = metrics.now_ms()
+            await self.save_message(self.profile, self.conversation_id, message, received_at)
+            metrics.observe('persist', metrics.now_ms() - started)
+
+        server_send_timestamp = int(time.time() * 1000)
         await self.channel_layer.group_send(
             self.room_group_name,
             {
@@ -60,54 +75,60 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'sender_id': self.profile.id,
                 'sender_name': self.user.get_full_name() or self.user.username,
                 'sender_type': self.profile._meta.model_name,
-                # --- Latency Measurement Addition ---
-                'client_send_timestamp': client_send_timestamp, # Pass client timestamp through
-                'server_receive_timestamp': server_receive_timestamp, # Pass server receive timestamp
-                'server_send_timestamp': int(time.time() * 1000) # Server sends message
-                # --- End Latency Measurement Addition ---
+                'client_send_timestamp': client_send_timestamp,
+                'server_receive_timestamp': server_receive_timestamp,
+                'server_send_timestamp': server_send_timestamp,
             }
         )
+        metrics.observe('group_send', metrics.now_ms() - server_send_timestamp)
+
+        if settings.CHAT_WRITE_BEHIND:
+            started = metrics.now_ms()
+            await message_buffer.add(Message(
+                conversation_id=self.conversation_id,
+                sender_content_type=self.sender_content_type,
+                sender_object_id=self.profile.pk,
+                content=message,
+                timestamp=received_at,
+            ))
+            metrics.observe('persist', metrics.now_ms() - started)
 
     async def chat_message(self, event):
-        print("SENDER IS", event['sender_id'])
         await self.send(text_data=json.dumps({
             'message': event['message'],
             'sender_id': event['sender_id'],
             'sender_name': event['sender_name'],
             'sender_type': event['sender_type'],
-            # --- Latency Measurement Addition ---
             'client_send_timestamp': event.get('client_send_timestamp'),
             'server_receive_timestamp': event.get('server_receive_timestamp'),
             'server_send_timestamp': event.get('server_send_timestamp'),
-            # --- End Latency Measurement Addition ---
         }))
+        # Fan-out latency: from handing the message to the channel layer
+        # until it is written to this recipient's socket.
+        if event.get('server_send_timestamp') is not None:
+            metrics.observe('deliver', metrics.now_ms() - event['server_send_timestamp'])
 
     @database_sync_to_async
     def is_user_in_conversation(self, profile, conversation_id):
         """
         Checks if the given profile (Tutor or Student) is a participant
-        in the specified conversation.
+        in the specified conversation, using the cached member set.
         """
-        conversation = Conversation.objects.filter(pk=conversation_id).first()
-        if not conversation:
-            return False
-            
-        exists = conversation.participants.filter(
-            user_content_type=ContentType.objects.get_for_model(profile),
-            user_object_id=profile.pk
-        ).exists()
-        print(f"Result: Participant check returned '{exists}'.")
-        print("------------------------\n")
-        return conversation.participants.filter(
-            user_content_type=ContentType.objects.get_for_model(profile),
-            user_object_id=profile.pk
-        ).exists()
+        # get_for_model is served from ContentType's in-process cache after
+        # the first call; the content type is reused when saving messages.
+        self.sender_content_type = ContentType.objects.get_for_model(profile)
+        members = get_conversation_members(conversation_id)
+        return (self.sender_content_type.id, profile.pk) in members
 
     @database_sync_to_async
-    def save_message(self, sender, conversation_id, content):
-        conversation = Conversation.objects.get(pk=conversation_id)
-        return Message.objects.create(
-            conversation=conversation,
-            sender=sender,
-            content=content
+    def save_message(self, sender, conversation_id, content, timestamp):
+        message = Message.objects.create(
+            conversation_id=conversation_id,
+            sender_content_type=self.sender_content_type,
+            sender_object_id=sender.pk,
+            content=content,
+            timestamp=timestamp,
         )
+        # Members come from the cache is_user_in_conversation just filled.
+        invalidate_conversations([conversation_id])
+        return message
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from chat.models import ArchivedMessage, Message
+
+
+class Command(BaseCommand):
+    help = "Moves chat messages older than CHAT_ARCHIVE_AFTER_DAYS into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHAT_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        days = options['days']
+        batch_size = options['batch_size']
+        if days <= 0:
+            raise CommandError("Archiving is disabled. Set CHAT_ARCHIVE_AFTER_DAYS or pass --days.")
+
+        cutoff = timezone.now() - timedelta(days=days)
+        moved = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    Message.objects.filter(timestamp__lt=cutoff)
+                    .order_by('timestamp', 'id')
+                    .select_for_update(skip_locked=True)[:batch_size]
+                )
+                if not batch:
+                    break
+                ArchivedMessage.objects.bulk_create(
+                    [
+                        ArchivedMessage(
+                            id=m.id,
+                            conversation_id=m.conversation_id,
+                            content=m.content,
+                            timestamp=m.timestamp,
+                            sender_content_type_id=m.sender_content_type_id,
+                            sender_object_id=m.sender_object_id,
+                        )
+                        for m in batch
+                    ],
+                    ignore_conflicts=True,
+                )
+                Message.objects.filter(id__in=[m.id for m in batch]).delete()
+            moved += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} messages older than {cutoff:%Y-%m-%d}."))
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import time
+import uuid
+
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+import chat.routing
+from chat.middleware import TicketAuthMiddlewareStack
+from chat.models import Conversation, Participant
+from chat.persistence import message_buffer
+from students.models import Student
+
+BENCH_PREFIX = "bench_"
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-tests ChatConsumer in-process: opens N participants in each of M "
+        "conversations through the ticket auth stack, drives a fixed message rate "
+        "and reports connect time, throughput and fan-out latency percentiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conversations', type=int, default=10)
+        parser.add_argument('--participants', type=int, default=2, help="Participants per conversation.")
+        parser.add_argument('--rate', type=float, default=1.0, help="Messages per second per participant.")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds to keep sending.")
+        parser.add_argument('--drain-timeout', type=float, default=10.0)
+        parser.add_argument(
+            '--layer', choices=['memory', 'configured'], default='memory',
+            help="Use the in-memory channel layer, or CHANNEL_LAYERS as configured (e.g. a local Redis).",
+        )
+        parser.add_argument('--keep', action='store_true', help="Keep the generated users and conversations.")
+
+    def handle(self, *args, **options):
+        if options['participants'] < 1 or options['conversations'] < 1:
+            raise CommandError("--participants and --conversations must be positive.")
+
+        layers = None
+        if options['layer'] == 'memory':
+            layers = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+        run_id = uuid.uuid4().hex[:8]
+        rooms = self.create_fixtures(run_id, options['conversations'], options['participants'])
+        try:
+            with override_settings(**({'CHANNEL_LAYERS': layers} if layers else {})):
+                results = asyncio.run(self.run(rooms, options))
+        finally:
+            if not options['keep']:
+                self.delete_fixtures(run_id, rooms)
+        self.report(results, options)
+
+    def create_fixtures(self, run_id, conversations, participants):
+        users = User.objects.bulk_create([
+            User(username=f"{BENCH_PREFIX}{run_id}_{i}")
+            for i in range(conversations * participants)
+        ])
+        students = Student.objects.bulk_create([
+            Student(user=user, grade=1, school_name="benchmark") for user in users
+        ])
+        rooms = []
+        for index in range(conversations):
+            convo = Conversation.objects.create()
+            members = students[index * participants:(index + 1) * participants]
+            for student in members:
+                Participant.objects.create(conversation=convo, user=student)
+            rooms.append((convo.id, members))
+        return rooms
+
+    def delete_fixtures(self, run_id, rooms):
+        Conversation.objects.filter(id__in=[convo_id for convo_id, _ in rooms]).delete()
+        User.objects.filter(username__startswith=f"{BENCH_PREFIX}{run_id}_").delete()
+
+    async def run(self, rooms, options):
+        application = TicketAuthMiddlewareStack(URLRouter(chat.routing.websocket_urlpatterns))
+        messages_each = int(options['rate'] * options['duration'])
+        interval = 1 / options['rate'] if options['rate'] > 0 else 0
+
+        results = {'connect_ms': [], 'latency_ms': [], 'sent': 0, 'received': 0, 'lost': 0, 'failed': 0}
+
+        async def open_client(convo_id, student):
+            ticket = str(uuid.uuid4())
+            cache.set(f"ws_ticket_{ticket}", {'user_pk': student.pk, 'user_type': 'student'}, timeout=60)
+            communicator = WebsocketCommunicator(application, f"/ws/chat/{convo_id}/?ticket={ticket}")
+            started = time.perf_counter()
+            connected, _ = await communicator.connect()
+            if not connected:
+                results['failed'] += 1
+                return None
+            results['connect_ms'].append((time.perf_counter() - started) * 1000)
+            return communicator
+
+        clients = []
+        for convo_id, members in rooms:
+            opened = await asyncio.gather(*(open_client(convo_id, student) for student in members))
+            clients.append([c for c in opened if c is not None])
+
+        async def send_loop(communicator):
+            for i in range(messages_each):
+                await communicator.send_to(text_data=json.dumps({
+                    'message': f"bench {i}",
+                    'client_send_timestamp': time.time() * 1000,
+                }))
+                results['sent'] += 1
+                if interval:
+                    await asyncio.sleep(interval)
+
+        async def receive_loop(communicator, expected):
+            for count in range(expected):
+                try:
+                    raw = await communicator.receive_from(timeout=options['drain_timeout'])
+                except asyncio.TimeoutError:
+                    results['lost'] += expected - count
+                    return
+                data = json.loads(raw)
+                results['received'] += 1
+                if data.get('client_send_timestamp') is not None:
+                    results['latency_ms'].append(time.time() * 1000 - data['client_send_timestamp'])
+
+        started = time.perf_counter()
+        tasks = []
+        for room_clients in clients:
+            expected = messages_each * len(room_clients)
+            for communicator in room_clients:
+                tasks.append(send_loop(communicator))
+                tasks.append(receive_loop(communicator, expected))
+        await asyncio.gather(*tasks)
+        results['elapsed'] = time.perf_counter() - started
+
+        for room_clients in clients:
+            for communicator in room_clients:
+                await communicator.disconnect()
+        await message_buffer.flush()
+        return results
+
+    def report(self, results, options):
+        connect = sorted(results['connect_ms'])
+        latency = sorted(results['latency_ms'])
+        elapsed = results.get('elapsed') or 1
+
+        def fmt(value):
+            return "-" if value is None else f"{value:.1f}"
+
+        out = self.stdout
+        out.write(
+            f"Clients: {len(connect)} connected, {results['failed']} rejected "
+            f"({options['conversations']} conversations x {options['participants']} participants)"
+        )
+        out.write(
+            f"Connect ms: p50 {fmt(percentile(connect, 0.5))} p99 {fmt(percentile(connect, 0.99))} "
+            f"max {fmt(connect[-1] if connect else None)}"
+        )
+        out.write(
+            f"Messages: {results['sent']} sent, {results['received']} delivered, "
+            f"{results['lost']} lost in {elapsed:.2f}s"
+        )
+        out.write(
+            f"Throughput: {results['sent'] / elapsed:.1f} msg/s in, "
+            f"{results['received'] / elapsed:.1f} deliveries/s out"
+        )
+        out.write(
+            f"Fan-out latency ms: p50 {fmt(percentile(latency, 0.5))} p95 {fmt(percentile(latency, 0.95))} "
+            f"p99 {fmt(percentile(latency, 0.99))} max {fmt(latency[-1] if latency else None)}"
+        )
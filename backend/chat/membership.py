@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Participant
+
+
+def _cache_key(conversation_id):
+    return f"chat_members_{conversation_id}"
+
+
+def get_conversation_members(conversation_id):
+    """
+    Returns the set of (content_type_id, object_id) pairs taking part in a
+    conversation. Cached in the default cache until a Participant of the
+    conversation changes (see chat.signals).
+    """
+    key = _cache_key(conversation_id)
+    members = cache.get(key)
+    if members is None:
+        members = set(Participant.objects.filter(
+            conversation_id=conversation_id
+        ).values_list('user_content_type_id', 'user_object_id'))
+        cache.set(key, members, timeout=settings.CHAT_MEMBERSHIP_CACHE_TIMEOUT)
+    return members
+
+
+def get_members_of(conversation_ids):
+    """
+    get_conversation_members for several conversations at once, with one
+    cache round trip and at most one query for the ones not cached.
+    Returns a dict of conversation id to member set.
+    """
+    keys = {_cache_key(conversation_id): conversation_id for conversation_id in set(conversation_ids)}
+    cached = cache.get_many(list(keys))
+    members = {keys[key]: value for key, value in cached.items()}
+    missing = [conversation_id for key, conversation_id in keys.items() if key not in cached]
+    if missing:
+        fetched = {conversation_id: set() for conversation_id in missing}
+        for conversation_id, content_type_id, object_id in Participant.objects.filter(
+            conversation_id__in=missing
+        ).values_list('conversation_id', 'user_content_type_id', 'user_object_id'):
+            fetched[conversation_id].add((content_type_id, object_id))
+        cache.set_many(
+            {_cache_key(conversation_id): value for conversation_id, value in fetched.items()},
+            timeout=settings.CHAT_MEMBERSHIP_CACHE_TIMEOUT,
+        )
+        members.update(fetched)
+    return members
+
+
+def invalidate_conversation_members(conversation_id):
+    cache.delete(_cache_key(conversation_id))
@@ -0,0 +1,87 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+# Upper bounds in milliseconds, Prometheus-style (the last bucket is +Inf).
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+CHAT_STAGES = ('receive', 'persist', 'group_send', 'deliver')
+
+
+class Histogram:
+    """A fixed-bucket latency histogram, safe to update from any thread."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value_ms):
+        index = bisect_left(self.buckets, value_ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value_ms
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._counts), self._sum
+
+    def quantile(self, q):
+        """Estimates a quantile by linear interpolation inside its bucket."""
+        counts, _ = self.snapshot()
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0
+                if index == len(self.buckets):
+                    return float(lower)
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return float(self.buckets[-1])
+
+
+chat_latency = {stage: Histogram() for stage in CHAT_STAGES}
+
+
+def now_ms():
+    return time.time() * 1000
+
+
+def observe(stage, value_ms):
+    if settings.CHAT_METRICS_ENABLED and value_ms is not None and value_ms >= 0:
+        chat_latency[stage].observe(value_ms)
+
+
+def render_prometheus():
+    lines = [
+        "# HELP tutorhub_chat_stage_latency_ms Chat message latency per stage in milliseconds.",
+        "# TYPE tutorhub_chat_stage_latency_ms histogram",
+    ]
+    for stage, histogram in chat_latency.items():
+        counts, total_sum = histogram.snapshot()
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + ('+Inf',), counts):
+            cumulative += count
+            lines.append(f'tutorhub_chat_stage_latency_ms_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'tutorhub_chat_stage_latency_ms_sum{{stage="{stage}"}} {total_sum}')
+        lines.append(f'tutorhub_chat_stage_latency_ms_count{{stage="{stage}"}} {cumulative}')
+    return "\n".join(lines) + "\n"
+
+
+def summary():
+    return {
+        stage: {
+            'count': sum(histogram.snapshot()[0]),
+            'p50': histogram.quantile(0.5),
+            'p99': histogram.quantile(0.99),
+        }
+        for stage, histogram in chat_latency.items()
+    }
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:06
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_private_keys(apps, schema_editor):
+    Conversation = apps.get_model('chat', 'Conversation')
+    Participant = apps.get_model('chat', 'Participant')
+
+    members = defaultdict(list)
+    for conversation_id, ct_id, obj_id in Participant.objects.values_list(
+        'conversation_id', 'user_content_type_id', 'user_object_id'
+    ).iterator():
+        members[conversation_id].append((ct_id, obj_id))
+
+    seen = set()
+    to_update = []
+    for convo in Conversation.objects.order_by('created_at').iterator():
+        pair = members.get(convo.id, [])
+        if len(pair) != 2:
+            continue
+        key = "|".join(f"{ct_id}:{obj_id}" for ct_id, obj_id in sorted(pair))
+        # Older duplicates of the same pair keep working but only the
+        # first one becomes the canonical private chat.
+        if key in seen:
+            continue
+        seen.add(key)
+        convo.private_key = key
+        to_update.append(convo)
+
+    Conversation.objects.bulk_update(to_update, ['private_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_conversation_alter_message_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='private_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_private_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:12
+
+from django.db import migrations, models
+from django.db.models.functions import Now
+
+
+def mark_existing_read(apps, schema_editor):
+    # Chats that predate read markers start out fully read rather than
+    # showing their whole history as unread.
+    Participant = apps.get_model('chat', 'Participant')
+    Participant.objects.update(last_read_at=Now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0005_alter_message_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='last_read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_existing_read, migrations.RunPython.noop),
+    ]
@@ -1,44 +1,119 @@
 # chat/models.py
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Count
+from django.db.models.functions import Coalesce, Substr
+from django.db.models.lookups import IsNull
+from django.utils import timezone
 import uuid
 
+LAST_MESSAGE_PREVIEW_LENGTH = 100
 
 
 class ConversationManager(models.Manager):
-    def find_or_create_private_chat(self, user1, user2):
-        print("\n--- [INSIDE THE MANAGER V2] ---")
-        print(f"Finding or creating chat for: {user1} (ID: {user1.pk}) AND {user2} (ID: {user2.pk})")
+    @staticmethod
+    def build_private_key(user1, user2):
+        """
+        Builds an order-independent key for a pair of profiles, e.g.
+        "12:3|13:7" for (tutor 3, student 7) no matter who starts the chat.
+        """
+        user1_ct = ContentType.objects.get_for_model(user1)
+        user2_ct = ContentType.objects.get_for_model(user2)
+        members = sorted([(user1_ct.id, user1.pk), (user2_ct.id, user2.pk)])
+        return "|".join(f"{ct_id}:{obj_id}" for ct_id, obj_id in members)
 
+    def find_or_create_private_chat(self, user1, user2):
         user1_ct = ContentType.objects.get_for_model(user1)
         user2_ct = ContentType.objects.get_for_model(user2)
 
         if user1_ct == user2_ct and user1.pk == user2.pk:
             return False
 
-        qs = self.get_queryset().annotate(num_participants=Count('participants')).filter(num_participants=2)
-
-        for convo in qs:
-            participants = convo.participants.all()
-            p_set = set((p.user_content_type_id, p.user_object_id) for p in participants)
-            need = {
-                (user1_ct.id, user1.id),
-                (user2_ct.id, user2.id),
-            }
-            if p_set == need:
-                return convo, False
+        private_key = self.build_private_key(user1, user2)
+
+        convo = self.get_queryset().filter(private_key=private_key).first()
+        if convo:
+            return convo, False
+
+        # The unique index on private_key makes concurrent "start chat"
+        # requests race-free: the loser rolls back and reads the winner's row.
+        try:
+            with transaction.atomic():
+                new_convo = self.create(private_key=private_key)
+                Participant.objects.bulk_create([
+                    Participant(conversation=new_convo, user_content_type=user1_ct, user_object_id=user1.pk),
+                    Participant(conversation=new_convo, user_content_type=user2_ct, user_object_id=user2.pk),
+                ])
+        except IntegrityError:
+            return self.get_queryset().get(private_key=private_key), False
+
+        # bulk_create skips post_save, so drop any cached member set here.
+        from .membership import invalidate_conversation_members
+        invalidate_conversation_members(new_convo.id)
+        return new_convo, True
+
+    def inbox_for(self, profile):
+        """
+        The profile's conversations, most recently active first, annotated
+        in a single query with `last_message`, `last_activity` and
+        `unread_count` (messages from others since the profile's read marker,
+        archived ones included).
+        """
+        content_type = ContentType.objects.get_for_model(profile)
+        mine = Participant.objects.filter(
+            conversation=models.OuterRef('pk'),
+            user_content_type=content_type,
+            user_object_id=profile.pk,
+        )
+        latest = Message.objects.filter(conversation=models.OuterRef('pk')).order_by('-timestamp', '-id')
+        last_message = models.Subquery(latest.values(preview=Substr('content', 1, LAST_MESSAGE_PREVIEW_LENGTH))[:1])
+        last_message_at = models.Subquery(latest.values('timestamp')[:1])
+        # Conversations whose every message was archived; only read when the
+        # live table has none. Archived rows stay readable even if archiving
+        # is switched off later.
+        archived = ArchivedMessage.objects.filter(conversation=models.OuterRef('pk')).order_by('-timestamp', '-id')
+        last_message = Coalesce(
+            last_message,
+            models.Subquery(archived.values(preview=Substr('content', 1, LAST_MESSAGE_PREVIEW_LENGTH))[:1]),
+        )
+        last_message_at = Coalesce(last_message_at, models.Subquery(archived.values('timestamp')[:1]))
+
+        def unread(model):
+            # The read marker is a timestamp, so it holds for archived rows too.
+            messages = model.objects.filter(
+                conversation=models.OuterRef('pk'),
+            ).exclude(
+                sender_content_type=content_type,
+                sender_object_id=profile.pk,
+            ).filter(
+                models.Q(timestamp__gt=models.OuterRef('my_last_read_at'))
+                | models.Q(IsNull(models.OuterRef('my_last_read_at'), True))
+            )
+            return Coalesce(
+                models.Subquery(
+                    messages.order_by().values('conversation').annotate(n=models.Count('pk')).values('n')
+                ),
+                0,
+            )
+
+        return self.get_queryset().filter(
+            models.Exists(mine)
+        ).annotate(
+            my_last_read_at=models.Subquery(mine.values('last_read_at')[:1]),
+        ).annotate(
+            last_message=last_message,
+            last_activity=Coalesce(last_message_at, 'created_at'),
+            unread_count=unread(Message) + unread(ArchivedMessage),
+        ).order_by('-last_activity')
 
-        new_convo = self.create()
-        Participant.objects.create(conversation=new_convo, user=user1)
-        Participant.objects.create(conversation=new_convo, user=user2)
-        return new_convo, True    
 
 class Conversation(models.Model):
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Canonical participant-pair key for private chats, see
+    # ConversationManager.build_private_key. Null for any other conversation.
+    private_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
 
     objects = ConversationManager() 
 
@@ -52,6 +127,8 @@ class Participant(models.Model):
     user_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     user_object_id = models.PositiveIntegerField()
     user = GenericForeignKey('user_content_type', 'user_object_id')
+    # Read marker: messages after this moment count as unread for this user.
+    last_read_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         unique_together = ('conversation', 'user_content_type', 'user_object_id')
@@ -66,10 +143,49 @@ class Message(models.Model):
     """
     conversation = models.ForeignKey(Conversation, related_name='messages', on_delete=models.CASCADE)
     content = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     sender_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     sender_object_id = models.PositiveIntegerField()
     sender = GenericForeignKey('sender_content_type', 'sender_object_id')
     class Meta:
         ordering = ('timestamp',)
+        indexes = [
+            # History reads filter by conversation and walk (timestamp, id).
+            models.Index(fields=['conversation', 'timestamp', 'id'], name='chat_msg_convo_ts_id_idx'),
+        ]
+
+
+class ArchivedMessage(models.Model):
+    """
+    Cold storage for messages older than CHAT_ARCHIVE_AFTER_DAYS, filled by
+    the `archive_chat_messages` command. Rows keep their original id and
+    timestamp so history cursors stay valid across both tables.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    conversation = models.ForeignKey(Conversation, related_name='archived_messages', on_delete=models.CASCADE)
+    content = models.TextField()
+    timestamp = models.DateTimeField()
+    sender_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    sender_object_id = models.PositiveIntegerField()
+    sender = GenericForeignKey('sender_content_type', 'sender_object_id')
+
+    class Meta:
+        ordering = ('timestamp',)
+        indexes = [
+            models.Index(fields=['conversation', 'timestamp', 'id'], name='chat_arch_convo_ts_id_idx'),
+        ]
+
+
+def message_history_segments(conversation_id):
+    """
+    Querysets holding a conversation's history, oldest segment first.
+    Archived messages are always older than the ones left in Message. The
+    archive is read whatever CHAT_ARCHIVE_AFTER_DAYS says, which only
+    controls the `archive_chat_messages` command.
+    """
+    return [
+        ArchivedMessage.objects.filter(conversation_id=conversation_id),
+        Message.objects.filter(conversation_id=conversation_id),
+    ]
+
 
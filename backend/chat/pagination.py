@@ -0,0 +1,134 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class MessageKeysetPagination(BasePagination):
+    """
+    Keyset pagination over (timestamp, id) for message history.
+
+    Without a cursor the latest page is returned. `before` walks back to
+    older messages and `after` forward to newer ones; both take the opaque
+    cursors handed out in `previous` / `next`. Each page is returned in
+    chronological order.
+
+    The queryset may also be a list of querysets over tables that hold
+    consecutive stretches of the same history, oldest first.
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    before_query_param = 'before'
+    after_query_param = 'after'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        before = self.decode_cursor(request.query_params.get(self.before_query_param))
+        after = self.decode_cursor(request.query_params.get(self.after_query_param))
+
+        if before and after:
+            raise ValidationError("Pass either 'before' or 'after', not both.")
+
+        # A list of querysets is read as consecutive, oldest-first segments
+        # of the same history (e.g. archived messages, then live ones).
+        segments = list(queryset) if isinstance(queryset, (list, tuple)) else [queryset]
+
+        if after:
+            timestamp, pk = after
+            rows = self._collect(
+                segments,
+                Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk),
+                ('timestamp', 'id'),
+                page_size + 1,
+            )
+            self.has_newer = len(rows) > page_size
+            self.has_older = True
+            page = rows[:page_size]
+        else:
+            keyset = Q()
+            if before:
+                timestamp, pk = before
+                keyset = Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk)
+            rows = self._collect(segments[::-1], keyset, ('-timestamp', '-id'), page_size + 1)
+            self.has_older = len(rows) > page_size
+            self.has_newer = bool(before)
+            page = rows[:page_size][::-1]
+
+        self.page = page
+        return page
+
+    @staticmethod
+    def _collect(segments, keyset, ordering, limit):
+        rows = []
+        for segment in segments:
+            rows.extend(segment.filter(keyset).order_by(*ordering)[:limit - len(rows)])
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw is None:
+            return self.page_size
+        try:
+            size = int(raw)
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: "Must be an integer."})
+        if size < 1:
+            raise ValidationError({self.page_size_query_param: "Must be a positive integer."})
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.page or not self.has_newer:
+            return None
+        return self._link(self.after_query_param, self.before_query_param, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.page or not self.has_older:
+            return None
+        return self._link(self.before_query_param, self.after_query_param, self.page[0])
+
+    def _link(self, param, other_param, message):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, other_param)
+        return replace_query_param(url, param, self.encode_cursor(message))
+
+    @staticmethod
+    def encode_cursor(message):
+        raw = f"{message.timestamp.isoformat()}|{message.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+            timestamp, pk = raw.rsplit('|', 1)
+            return datetime.fromisoformat(timestamp), int(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise ValidationError("Invalid cursor.")
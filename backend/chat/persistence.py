@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from core.graphql_api.cache import invalidate_conversations
+
+from .models import Conversation, Message
+
+logger = logging.getLogger(__name__)
+dead_letter = logging.getLogger('chat.dead_letter')
+
+
+class MessageWriteBuffer:
+    """
+    Per-process write-behind buffer for chat messages.
+
+    Messages are queued in receive order and written with bulk_create once
+    CHAT_WRITE_BEHIND_BATCH_SIZE are pending or CHAT_WRITE_BEHIND_INTERVAL
+    seconds have passed, whichever comes first. Flushes are serialized, and
+    a batch that fails to write is put back at the head of the queue, so
+    messages are persisted in the order they were received. After
+    CHAT_WRITE_BEHIND_MAX_ATTEMPTS failed flushes in a row the messages are
+    written one at a time, and the ones that still fail are logged in full
+    to the `chat.dead_letter` logger and dropped.
+    """
+
+    def __init__(self):
+        self._pending = []
+        self._lock = None
+        self._timer = None
+        self._failures = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    async def add(self, message):
+        self._pending.append(message)
+        if len(self._pending) >= settings.CHAT_WRITE_BEHIND_BATCH_SIZE:
+            await self.flush()
+        else:
+            self._schedule()
+
+    async def flush(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._cancel_timer()
+            batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                await database_sync_to_async(self._write)(batch)
+            except Exception:
+                self._failures += 1
+                if self._failures < settings.CHAT_WRITE_BEHIND_MAX_ATTEMPTS:
+                    logger.exception("Failed to persist %d chat messages, will retry", len(batch))
+                    self._pending[:0] = batch
+                    self._schedule()
+                    return
+                logger.exception("Failed to persist %d chat messages %d times, writing them one by one",
+                                 len(batch), self._failures)
+                await database_sync_to_async(self._write_each)(batch)
+            self._failures = 0
+
+    def _schedule(self):
+        if self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(
+                settings.CHAT_WRITE_BEHIND_INTERVAL,
+                lambda: loop.create_task(self.flush()),
+            )
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    @staticmethod
+    def _write(batch):
+        try:
+            with transaction.atomic():
+                Message.objects.bulk_create(batch)
+        except IntegrityError:
+            # A conversation was deleted while its messages sat in the buffer.
+            with transaction.atomic():
+                live = set(Conversation.objects.filter(
+                    id__in={m.conversation_id for m in batch}
+                ).values_list('id', flat=True))
+                batch = [m for m in batch if m.conversation_id in live]
+                Message.objects.bulk_create(batch)
+        _invalidate(batch)
+
+    @staticmethod
+    def _write_each(batch):
+        written = []
+        for message in batch:
+            try:
+                with transaction.atomic():
+                    message.save(force_insert=True)
+            except Exception:
+                dead_letter.exception("Dropped chat message: %s", json.dumps({
+                    'conversation_id': str(message.conversation_id),
+                    'sender_content_type_id': message.sender_content_type_id,
+                    'sender_object_id': message.sender_object_id,
+                    'timestamp': message.timestamp.isoformat() if message.timestamp else None,
+                    'content': message.content,
+                }))
+            else:
+                written.append(message)
+        _invalidate(written)
+
+
+def _invalidate(messages):
+    # bulk_create skips post_save, so drop cached GraphQL inboxes here. The
+    # rows are already stored; a failure here must not get them re-queued.
+    if not messages:
+        return
+    try:
+        invalidate_conversations({m.conversation_id for m in messages})
+    except Exception:
+        logger.exception("Failed to drop cached inboxes of %d chat messages", len(messages))
+
+
+message_buffer = MessageWriteBuffer()
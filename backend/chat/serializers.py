@@ -37,11 +37,15 @@ class ParticipantSerializer(serializers.ModelSerializer):
 
 # The main serializer for chat list
 class ConversationListSerializer(serializers.ModelSerializer):
+    """Expects conversations from Conversation.objects.inbox_for()."""
     other_participant = serializers.SerializerMethodField()
+    last_message = serializers.CharField(read_only=True, allow_null=True)
+    last_activity = serializers.DateTimeField(read_only=True)
+    unread_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Conversation
-        fields = ['id', 'other_participant']
+        fields = ['id', 'other_participant', 'last_message', 'last_activity', 'unread_count']
 
     def get_other_participant(self, obj):
 
@@ -1,3 +1,433 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from core.testing import IN_MEMORY_CHANNELS, LOCMEM_CACHE, make_student, make_tutor
+from students.models import Student
+from tutors.models import Tutor
+
+from . import metrics
+from .consumers import ChatConsumer
+from .membership import get_conversation_members, get_members_of
+from .models import ArchivedMessage, Conversation, Message, Participant
+from .pagination import MessageKeysetPagination
+from .persistence import MessageWriteBuffer
+
+
+def make_pair():
+    tutor, student = make_tutor(), make_student()
+    conversation, _created = Conversation.objects.find_or_create_private_chat(tutor, student)
+    return tutor, student, conversation
+
+
+def chat_communicator(conversation, profile):
+    """A ChatConsumer connection of `profile`, as the auth middleware would set it up."""
+    consumer = ChatConsumer.as_asgi()
+
+    async def app(scope, receive, send):
+        return await consumer({
+            **scope, 'user': profile.user, 'profile': profile,
+            'url_route': {'kwargs': {'conversation_id': conversation.id}},
+        }, receive, send)
+    return WebsocketCommunicator(app, f'/ws/chat/{conversation.id}/')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PrivateChatTests(TestCase):
+    def setUp(self):
+        self.tutor, self.student = make_tutor(), make_student()
+
+    def test_either_side_finds_the_same_chat(self):
+        conversation, created = Conversation.objects.find_or_create_private_chat(self.tutor, self.student)
+        self.assertTrue(created)
+        self.assertEqual(
+            Conversation.objects.find_or_create_private_chat(self.student, self.tutor), (conversation, False),
+        )
+        self.assertEqual(Participant.objects.filter(conversation=conversation).count(), 2)
+
+    def test_no_chat_with_oneself(self):
+        self.assertIs(Conversation.objects.find_or_create_private_chat(self.tutor, self.tutor), False)
+
+    def test_concurrent_creation_returns_the_winner(self):
+        winner, created = Conversation.objects.find_or_create_private_chat(self.student, self.tutor)
+        self.assertTrue(created)
+        # Our lookup ran before the other side's insert committed.
+        with mock.patch('django.db.models.query.QuerySet.first', return_value=None):
+            conversation, created = Conversation.objects.find_or_create_private_chat(self.tutor, self.student)
+        self.assertFalse(created)
+        self.assertEqual(conversation, winner)
+        self.assertEqual(Conversation.objects.count(), 1)
+        self.assertEqual(Participant.objects.filter(conversation=winner).count(), 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class MembershipTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tutor, self.student, self.conversation = make_pair()
+        self.tutor_member = (ContentType.objects.get_for_model(Tutor).id, self.tutor.pk)
+        self.student_member = (ContentType.objects.get_for_model(Student).id, self.student.pk)
+
+    def test_cached(self):
+        self.assertEqual(get_conversation_members(self.conversation.id), {self.tutor_member, self.student_member})
+        with self.assertNumQueries(0):
+            get_conversation_members(self.conversation.id)
+            get_members_of([self.conversation.id])
+
+    def test_removing_a_participant_invalidates(self):
+        get_conversation_members(self.conversation.id)
+        Participant.objects.get(conversation=self.conversation, user_object_id=self.student.pk,
+                                user_content_type_id=self.student_member[0]).delete()
+        self.assertEqual(get_conversation_members(self.conversation.id), {self.tutor_member})
+
+    def test_deleting_the_conversation_invalidates(self):
+        get_members_of([self.conversation.id])
+        conversation_id = self.conversation.id
+        self.conversation.delete()
+        self.assertEqual(get_members_of([conversation_id]), {conversation_id: set()})
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CHANNEL_LAYERS=IN_MEMORY_CHANNELS)
+class ChatConsumerMembershipTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.tutor, self.student, self.conversation = make_pair()
+
+    def connects(self, profile):
+        async def run():
+            communicator = chat_communicator(self.conversation, profile)
+            connected, _code = await communicator.connect()
+            await communicator.disconnect()
+            return connected
+        # The consumer prints every connect and disconnect.
+        with contextlib.redirect_stdout(io.StringIO()):
+            return async_to_sync(run)()
+
+    def test_participants_connect(self):
+        self.assertTrue(self.connects(self.student))
+
+    def test_outsiders_are_rejected(self):
+        self.assertFalse(self.connects(make_student('outsider')))
+
+    def test_removed_participant_is_rejected(self):
+        self.assertTrue(self.connects(self.student))
+        Participant.objects.filter(conversation=self.conversation, user_object_id=self.student.pk,
+                                   user_content_type=ContentType.objects.get_for_model(Student)).delete()
+        self.assertFalse(self.connects(self.student))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class InboxTests(TestCase):
+    def setUp(self):
+        self.tutor, self.student, self.conversation = make_pair()
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+        self.tutor_type = ContentType.objects.get_for_model(Tutor)
+        self.student_type = ContentType.objects.get_for_model(Student)
+
+    def send(self, sender, content, conversation=None, ago=timedelta(0)):
+        Message.objects.create(
+            conversation=conversation or self.conversation, content=content, timestamp=timezone.now() - ago,
+            sender_content_type=ContentType.objects.get_for_model(sender), sender_object_id=sender.pk,
+        )
+
+    def inbox(self):
+        response = self.client.get('/api/chats/all/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_unread_counts_other_side_only(self):
+        self.send(self.tutor, 'one', ago=timedelta(minutes=2))
+        self.send(self.tutor, 'two', ago=timedelta(minutes=1))
+        self.send(self.student, 'mine')
+        [conversation] = self.inbox()
+        self.assertEqual(conversation['unread_count'], 2)
+        self.assertEqual(conversation['last_message'], 'mine')
+        self.assertEqual(conversation['other_participant']['user']['username'], 'tutor')
+
+    def test_read_marker(self):
+        self.send(self.tutor, 'old', ago=timedelta(minutes=1))
+        response = self.client.post(f'/api/conversations/{self.conversation.id}/read/')
+        self.assertEqual(response.status_code, 200)
+        self.send(self.tutor, 'new', ago=timedelta(seconds=-1))
+        self.assertEqual(self.inbox()[0]['unread_count'], 1)
+
+    def test_users_without_profile(self):
+        self.client.force_authenticate(User.objects.create_user('staff'))
+        self.assertEqual(self.inbox(), [])
+        response = self.client.post(f'/api/conversations/{self.conversation.id}/read/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_read_marker_outside_conversation(self):
+        self.client.force_authenticate(make_student('outsider').user)
+        response = self.client.post(f'/api/conversations/{self.conversation.id}/read/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_archived_messages_stay_unread(self):
+        self.send(self.tutor, 'old', ago=timedelta(days=3))
+        self.send(self.tutor, 'new')
+        call_command('archive_chat_messages', days=2, stdout=io.StringIO())
+        self.assertEqual(ArchivedMessage.objects.count(), 1)
+        self.assertEqual(self.inbox()[0]['unread_count'], 2)
+
+        Participant.objects.filter(conversation=self.conversation, user_content_type=self.student_type).update(
+            last_read_at=timezone.now() - timedelta(days=1),
+        )
+        self.assertEqual(self.inbox()[0]['unread_count'], 1)
+
+    def test_most_recent_first_in_fixed_queries(self):
+        self.send(self.tutor, 'hello')
+        self.inbox()
+        with CaptureQueriesContext(connection) as one:
+            self.inbox()
+        for index in range(3):
+            tutor = make_tutor(f'tutor{index}')
+            conversation, _created = Conversation.objects.find_or_create_private_chat(tutor, self.student)
+            self.send(tutor, f'hello {index}', conversation=conversation, ago=timedelta(minutes=index + 1))
+        with CaptureQueriesContext(connection) as four:
+            inbox = self.inbox()
+        self.assertEqual(len(four), len(one))
+        self.assertEqual([c['last_message'] for c in inbox], ['hello', 'hello 0', 'hello 1', 'hello 2'])
+
+
+class HistogramTests(TestCase):
+    def test_buckets_and_quantiles(self):
+        histogram = metrics.Histogram(buckets=(10, 100))
+        for value in (1, 5, 50, 500):
+            histogram.observe(value)
+        self.assertEqual(histogram.snapshot(), ([2, 1, 1], 556))
+        self.assertEqual(histogram.quantile(0.5), 10)
+        self.assertEqual(histogram.quantile(1), 100)
+        self.assertIsNone(metrics.Histogram().quantile(0.5))
+
+    @override_settings(CHAT_METRICS_ENABLED=True)
+    def test_observe_skips_bad_values(self):
+        with mock.patch.dict(metrics.chat_latency, {'receive': metrics.Histogram()}):
+            metrics.observe('receive', 3)
+            metrics.observe('receive', -1)
+            metrics.observe('receive', None)
+            self.assertEqual(metrics.summary()['receive']['count'], 1)
+
+    @override_settings(CHAT_METRICS_ENABLED=False)
+    def test_observe_disabled(self):
+        with mock.patch.dict(metrics.chat_latency, {'receive': metrics.Histogram()}):
+            metrics.observe('receive', 3)
+            self.assertEqual(metrics.summary()['receive']['count'], 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CHANNEL_LAYERS=IN_MEMORY_CHANNELS, CHAT_METRICS_ENABLED=True,
+                   CHAT_WRITE_BEHIND=False)
+class ChatMetricsTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.tutor, self.student, self.conversation = make_pair()
+        self.enterContext(mock.patch.dict(
+            metrics.chat_latency, {stage: metrics.Histogram() for stage in metrics.CHAT_STAGES},
+        ))
+
+    def test_message_records_every_stage(self):
+        async def run():
+            communicator = chat_communicator(self.conversation, self.student)
+            await communicator.connect()
+            await communicator.send_json_to({'message': 'hi', 'client_send_timestamp': metrics.now_ms() - 5})
+            received = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return received
+        with contextlib.redirect_stdout(io.StringIO()):
+            received = async_to_sync(run)()
+        self.assertEqual(received['message'], 'hi')
+        self.assertEqual({stage: values['count'] for stage, values in metrics.summary().items()},
+                         {stage: 1 for stage in metrics.CHAT_STAGES})
+        self.assertIn('tutorhub_chat_stage_latency_ms_count{stage="deliver"} 1', metrics.render_prometheus())
+
+    def get(self, user=None, **headers):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client.get('/api/chat/metrics/', headers=headers)
+
+    def test_endpoint_is_staff_only_without_token(self):
+        self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(self.get(self.tutor.user).status_code, 403)
+        self.tutor.user.is_staff = True
+        response = self.get(self.tutor.user)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+    @override_settings(CHAT_METRICS_TOKEN='secret')
+    def test_endpoint_token(self):
+        self.assertEqual(self.get(**{'X-Metrics-Token': 'wrong'}).status_code, 403)
+        self.assertEqual(self.get(**{'X-Metrics-Token': 'secret'}).status_code, 200)
+
+    @override_settings(CHAT_METRICS_ENABLED=False)
+    def test_endpoint_disabled(self):
+        self.assertEqual(self.get(self.tutor.user).status_code, 404)
+
+
+class CursorTests(TestCase):
+    def test_round_trip(self):
+        message = Message(id=42, timestamp=timezone.now())
+        cursor = MessageKeysetPagination.encode_cursor(message)
+        self.assertEqual(MessageKeysetPagination.decode_cursor(cursor), (message.timestamp, 42))
+
+    def test_empty_cursor(self):
+        self.assertIsNone(MessageKeysetPagination.decode_cursor(''))
+        self.assertIsNone(MessageKeysetPagination.decode_cursor(None))
+
+    def test_invalid_cursor(self):
+        for cursor in ('not base64!', 'bm8tc2VwYXJhdG9y', 'eHx5'):
+            with self.assertRaises(ValidationError):
+                MessageKeysetPagination.decode_cursor(cursor)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class MessageHistoryTests(TestCase):
+    def setUp(self):
+        self.tutor, self.student, self.conversation = make_pair()
+        self.client = APIClient()
+        self.client.force_authenticate(self.tutor.user)
+        self.url = f'/api/conversations/{self.conversation.id}/messages/'
+        self.tutor_type = ContentType.objects.get_for_model(Tutor)
+        # Equal timestamps in pairs, so pages break inside a tie.
+        start = timezone.now() - timedelta(days=1)
+        Message.objects.bulk_create([
+            Message(conversation=self.conversation, content=str(i), timestamp=start + timedelta(seconds=i // 2),
+                    sender_content_type=self.tutor_type, sender_object_id=self.tutor.pk)
+            for i in range(25)
+        ])
+
+    def walk_back(self, url):
+        contents = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            contents = [message['content'] for message in response.data['results']] + contents
+            url = response.data['previous']
+        return contents
+
+    def test_latest_page_first(self):
+        response = self.client.get(self.url, {'page_size': 10})
+        self.assertEqual([m['content'] for m in response.data['results']], [str(i) for i in range(15, 25)])
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_pages_cover_history_once(self):
+        self.assertEqual(self.walk_back(self.url + '?page_size=4'), [str(i) for i in range(25)])
+
+    def test_after_walks_forward(self):
+        latest = self.client.get(self.url, {'page_size': 10})
+        older = self.client.get(latest.data['previous'])
+        newer = self.client.get(older.data['next'])
+        self.assertEqual(newer.data['results'], latest.data['results'])
+        self.assertIsNone(newer.data['next'])
+
+    def test_before_and_after_together(self):
+        cursor = MessageKeysetPagination.encode_cursor(Message.objects.first())
+        response = self.client.get(self.url, {'before': cursor, 'after': cursor})
+        self.assertEqual(response.status_code, 400)
+
+    def test_archive_then_live(self):
+        # Messages 0-11 are more than two days old.
+        Message.objects.filter(content__in=[str(i) for i in range(12)]).update(timestamp=F('timestamp') - timedelta(days=2))
+        call_command('archive_chat_messages', days=2, batch_size=5, stdout=io.StringIO())
+        self.assertEqual(ArchivedMessage.objects.count(), 12)
+        self.assertEqual(Message.objects.count(), 13)
+
+        # The archive is read even with archiving switched off.
+        with self.settings(CHAT_ARCHIVE_AFTER_DAYS=0):
+            self.assertEqual(self.walk_back(self.url + '?page_size=5'), [str(i) for i in range(25)])
+
+    def test_inbox_falls_back_to_archive(self):
+        last = Message.objects.order_by('-timestamp', '-id').first()
+        Message.objects.update(timestamp=F('timestamp') - timedelta(days=2))
+        call_command('archive_chat_messages', days=1, stdout=io.StringIO())
+        conversation = Conversation.objects.inbox_for(self.tutor).get()
+        self.assertEqual(conversation.last_message, '24')
+        self.assertEqual(conversation.last_activity, last.timestamp - timedelta(days=2))
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CHAT_WRITE_BEHIND_BATCH_SIZE=3, CHAT_WRITE_BEHIND_INTERVAL=60,
+                   CHAT_WRITE_BEHIND_MAX_ATTEMPTS=2)
+class MessageWriteBufferTests(TransactionTestCase):
+    def setUp(self):
+        self.tutor, self.student, self.conversation = make_pair()
+        self.tutor_type = ContentType.objects.get_for_model(Tutor)
+
+    def message(self, content, conversation=None):
+        return Message(conversation_id=(conversation or self.conversation).id, content=content, timestamp=timezone.now(),
+                       sender_content_type=self.tutor_type, sender_object_id=self.tutor.pk)
+
+    def run_buffer(self, steps):
+        async def run():
+            buffer = MessageWriteBuffer()
+            try:
+                await steps(buffer)
+            finally:
+                buffer._cancel_timer()
+            return buffer
+        return asyncio.run(run())
+
+    def contents(self):
+        return list(Message.objects.order_by('id').values_list('content', flat=True))
+
+    def test_flushes_full_batch_in_order(self):
+        async def steps(buffer):
+            for content in 'abcd':
+                await buffer.add(self.message(content))
+        buffer = self.run_buffer(steps)
+        self.assertEqual(self.contents(), ['a', 'b', 'c'])
+        self.assertEqual(len(buffer), 1)
+
+    def test_failed_batch_is_requeued_ahead(self):
+        async def steps(buffer):
+            await buffer.add(self.message('a'))
+            with mock.patch.object(MessageWriteBuffer, '_write', side_effect=RuntimeError):
+                await buffer.flush()
+            self.assertEqual(len(buffer), 1)
+            await buffer.add(self.message('b'))
+            await buffer.flush()
+        with self.assertLogs('chat.persistence', 'ERROR'):
+            self.run_buffer(steps)
+        self.assertEqual(self.contents(), ['a', 'b'])
+
+    def test_gives_up_after_max_attempts(self):
+        async def steps(buffer):
+            bad = self.message('bad')
+            bad.sender_object_id = None
+            await buffer.add(self.message('ok'))
+            await buffer.add(bad)
+            for _attempt in range(2):
+                await buffer.flush()
+            self.assertEqual(len(buffer), 0)
+        with self.assertLogs('chat.persistence', 'ERROR'), self.assertLogs('chat.dead_letter', 'ERROR') as logs:
+            self.run_buffer(steps)
+        self.assertEqual(self.contents(), ['ok'])
+        self.assertIn('"content": "bad"', logs.output[0])
+
+    def test_skips_deleted_conversations(self):
+        other = Conversation.objects.create()
+        kept, lost = self.message('kept'), self.message('lost', conversation=other)
+        other.delete()
+
+        async def steps(buffer):
+            await buffer.add(kept)
+            await buffer.add(lost)
+            await buffer.flush()
+        self.run_buffer(steps)
+        self.assertEqual(self.contents(), ['kept'])
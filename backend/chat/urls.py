@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import WebSocketTicketView, StartChatView, chat_room, MessageHistoryView, AllChatsView
+from .views import WebSocketTicketView, StartChatView, chat_room, MessageHistoryView, AllChatsView, ChatMetricsView, ConversationReadView
 
 urlpatterns = [
     
@@ -13,5 +13,9 @@ urlpatterns = [
 
     path('conversations/<uuid:conversation_id>/messages/', MessageHistoryView.as_view(), name='message-history'),
 
-    path('chats/all/', AllChatsView.as_view())
+    path('conversations/<uuid:conversation_id>/read/', ConversationReadView.as_view(), name='conversation-read'),
+
+    path('chats/all/', AllChatsView.as_view()),
+
+    path('chat/metrics/', ChatMetricsView.as_view(), name='chat-metrics'),
 ]
@@ -1,5 +1,8 @@
 from django.shortcuts import render, get_object_or_404
-from .models import Message, Participant
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from .models import Participant, message_history_segments
 import uuid
 from django.core.cache import cache
 from rest_framework.views import APIView
@@ -12,25 +15,20 @@ from .models import Conversation
 from rest_framework import generics, permissions
 from .serializers import MessageSerializer, ConversationListSerializer
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.contenttypes.prefetch import GenericPrefetch
+from django.db.models import prefetch_related_objects
+from .pagination import MessageKeysetPagination
+from . import metrics
+from core.views import PROMETHEUS_CONTENT_TYPE, metrics_access_denied
+from core.graphql_api.cache import invalidate_profile
 
 class WebSocketTicketView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
-        user = request.user
         ticket = str(uuid.uuid4())
 
-        user_profile = None
-        user_type = None
-
-
-        if hasattr(user, 'tutor'):
-            user_profile = user.tutor
-            user_type = 'tutor'
-
-        elif hasattr(user, 'student'):
-            user_profile = user.student
-            user_type = 'student'
+        user_profile = request.profile
 
         if not user_profile:
             return Response(
@@ -41,7 +39,7 @@ class WebSocketTicketView(APIView):
         
         user_info = {
             'user_pk': user_profile.pk,
-            'user_type': user_type
+            'user_type': user_profile._meta.model_name
         }
         
         cache_key = f"ws_ticket_{ticket}"
@@ -70,12 +68,8 @@ class StartChatView(APIView):
         else:
             return Response({'error': 'Invalid user type'}, status=400)
 
-        current_user_profile = None
-        if hasattr(request.user, 'tutor'):
-            current_user_profile = request.user.tutor
-        elif hasattr(request.user, 'student'):
-            current_user_profile = request.user.student
-        
+        current_user_profile = request.profile
+
         if not current_user_profile:
             return Response({'error': 'Your user profile could not be found.'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -106,54 +100,108 @@ def chat_room(request, conversation_id):
 
 class MessageHistoryView(generics.ListAPIView):
     """
-    Provides the message history for a specific conversation.
+    Provides the message history for a specific conversation, newest page
+    first. Use the `previous` link to scroll back in time.
     """
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated] 
+    pagination_class = MessageKeysetPagination
 
     def get_queryset(self):
-        conversation_id = self.kwargs['conversation_id']
-        return Message.objects.filter(conversation_id=conversation_id).order_by('timestamp')
+        # Archived and live messages, oldest segment first.
+        return message_history_segments(self.kwargs['conversation_id'])
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        # Senders are resolved per page with one query per profile type
+        # (user joined in), instead of two queries per message.
+        prefetch_related_objects(page, GenericPrefetch('sender', [
+            Tutor.objects.select_related('user'),
+            Student.objects.select_related('user'),
+        ]))
+        return page
 
 
 
 class AllChatsView(APIView):
+    """
+    The requester's inbox: each conversation with the other participant,
+    last message preview, last activity and unread count, most recent first.
+    """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        profile = getattr(user, 'tutor', None) or getattr(user, 'student', None)
-        
+        profile = request.profile
         if not profile:
             return Response([], status=status.HTTP_200_OK)
 
         content_type = ContentType.objects.get_for_model(profile.__class__)
 
- 
-        conversation_ids = Participant.objects.filter(
-            user_content_type=content_type,
-            user_object_id=profile.id
-        ).values_list('conversation_id', flat=True)
-
-        if not conversation_ids.exists():
-            return Response([])
-
+        conversations = list(Conversation.objects.inbox_for(profile))
 
         other_participants = Participant.objects.filter(
-            conversation_id__in=conversation_ids
+            conversation_id__in=[c.id for c in conversations]
         ).exclude(
             user_content_type=content_type,
             user_object_id=profile.id
-        ).select_related('user_content_type') 
-
+        ).prefetch_related(
+            GenericPrefetch('user', [
+                Tutor.objects.select_related('user'),
+                Student.objects.select_related('user'),
+            ])
+        )
 
         other_participants_map = {p.conversation_id: p for p in other_participants}
 
-        conversations = Conversation.objects.filter(id__in=conversation_ids)
-
         serializer = ConversationListSerializer(
             conversations,
             many=True,
             context={'other_participants_map': other_participants_map}
         )
         return Response(serializer.data)
+
+
+class ConversationReadView(APIView):
+    """
+    Moves the requester's read marker in a conversation to now.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, conversation_id):
+        profile = request.profile
+        if not profile:
+            return Response({'error': 'Your user profile could not be found.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        last_read_at = timezone.now()
+        updated = Participant.objects.filter(
+            conversation_id=conversation_id,
+            user_content_type=ContentType.objects.get_for_model(profile.__class__),
+            user_object_id=profile.id,
+        ).update(last_read_at=last_read_at)
+        if not updated:
+            raise Http404
+        invalidate_profile(profile)
+
+        return Response({'last_read_at': last_read_at})
+
+
+class ChatMetricsView(APIView):
+    """
+    Chat latency histograms in Prometheus text format, or p50/p99 per
+    stage as JSON with `?summary=1`. Figures are per worker process.
+    Scrapers send CHAT_METRICS_TOKEN as X-Metrics-Token; with no token
+    configured only staff users can read them.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        if not settings.CHAT_METRICS_ENABLED:
+            raise Http404
+
+        denied = metrics_access_denied(request, settings.CHAT_METRICS_TOKEN)
+        if denied is not None:
+            return denied
+
+        if request.query_params.get('summary'):
+            return Response(metrics.summary())
+        return HttpResponse(metrics.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+
+from students.models import Student
+
+from .models import Classroom
+from .serializers import ClassroomDetailSerializer
+
+
+def _cache_key(classroom_id):
+    return f"classroom_detail_{classroom_id}"
+
+
+def get_classroom_detail(classroom_id):
+    """
+    Returns the serialized classroom with its tutor and roster, or None if
+    it doesn't exist. Built with two queries whatever the roster size, then
+    cached until the roster or a member's profile changes (see
+    classroom.signals).
+    """
+    key = _cache_key(classroom_id)
+    data = cache.get(key)
+    if data is None:
+        classroom = Classroom.objects.select_related('tutor__user').prefetch_related(
+            Prefetch('students', queryset=Student.objects.select_related('user').order_by('id')),
+        ).filter(id=classroom_id).first()
+        if classroom is None:
+            return None
+        data = ClassroomDetailSerializer(classroom).data
+        cache.set(key, data, timeout=settings.CLASSROOM_DETAIL_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_classroom_details(classroom_ids):
+    keys = [_cache_key(classroom_id) for classroom_id in classroom_ids]
+    if keys:
+        # After commit, so a concurrent read can't cache the old roster again.
+        transaction.on_commit(lambda: cache.delete_many(keys))
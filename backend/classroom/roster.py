@@ -0,0 +1,80 @@
+from django.db import router
+from django.db.models.signals import m2m_changed
+
+from students.models import Student
+
+from .models import Classroom
+
+# Keeps IN lists and INSERT batches a comfortable size for the database.
+ROSTER_CHUNK_SIZE = 1000
+
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), ROSTER_CHUNK_SIZE):
+        yield values[start:start + ROSTER_CHUNK_SIZE]
+
+
+def resolve_students(usernames=(), student_ids=()):
+    """
+    Resolves usernames and Student ids to Student ids, a chunk of each per
+    query. Returns (found_ids, missing_usernames, missing_ids).
+    """
+    found = set()
+    by_username = {}
+    for chunk in _chunks(set(usernames)):
+        by_username.update(Student.objects.filter(user__username__in=chunk).values_list('user__username', 'id'))
+    found.update(by_username.values())
+
+    known_ids = set()
+    for chunk in _chunks(set(student_ids)):
+        known_ids.update(Student.objects.filter(id__in=chunk).values_list('id', flat=True))
+    found.update(known_ids)
+
+    missing_usernames = sorted(set(usernames) - by_username.keys())
+    missing_ids = sorted(set(student_ids) - known_ids)
+    return found, missing_usernames, missing_ids
+
+
+def _send(action, classroom, pk_set, using):
+    m2m_changed.send(
+        sender=Classroom.students.through, action=action, instance=classroom,
+        reverse=False, model=Student, pk_set=pk_set, using=using,
+    )
+
+
+def change_roster(classroom, action, student_ids):
+    """
+    Adds, removes or replaces students by diffing against the current
+    roster, then writes only the difference to the through table with bulk
+    INSERTs and DELETEs of up to ROSTER_CHUNK_SIZE rows each. Sends the same m2m_changed signals as
+    `classroom.students.add()`/`.remove()`, so cached details and GraphQL
+    responses are dropped. Call inside a transaction holding the classroom
+    row lock. Returns the sets of added and removed ids.
+    """
+    through = Classroom.students.through
+    using = router.db_for_write(through, instance=classroom)
+    current = set(through.objects.using(using).filter(classroom=classroom).values_list('student_id', flat=True))
+    student_ids = set(student_ids)
+
+    to_add = student_ids - current if action in ('add', 'replace') else set()
+    if action == 'remove':
+        to_remove = student_ids & current
+    elif action == 'replace':
+        to_remove = current - student_ids
+    else:
+        to_remove = set()
+
+    if to_remove:
+        _send('pre_remove', classroom, to_remove, using)
+        for chunk in _chunks(to_remove):
+            through.objects.using(using).filter(classroom=classroom, student_id__in=chunk).delete()
+        _send('post_remove', classroom, to_remove, using)
+    if to_add:
+        _send('pre_add', classroom, to_add, using)
+        through.objects.using(using).bulk_create(
+            [through(classroom=classroom, student_id=student_id) for student_id in sorted(to_add)],
+            batch_size=ROSTER_CHUNK_SIZE,
+        )
+        _send('post_add', classroom, to_add, using)
+    return to_add, to_remove
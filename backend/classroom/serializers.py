@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Classroom
 from students.models import Student
+from tutors.models import Tutor
 
 
 class ClassroomSerializer(serializers.ModelSerializer):
@@ -10,10 +11,9 @@ class ClassroomSerializer(serializers.ModelSerializer):
         write_only=True
     )
 
-    students = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Student.objects.all(),
-    )
+    # The roster is written through student_usernames here and through
+    # ClassroomRosterBulkView afterwards, so ids are output only.
+    students = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
 
     class Meta:
         model = Classroom
@@ -52,7 +52,7 @@ class TutorClassroomDetailSerializer(serializers.ModelSerializer):
     last_name = serializers.CharField(source='user.last_name')
 
     class Meta:
-        model = Student
+        model = Tutor
         fields = ['id', 'username', 'first_name', 'last_name']
 
 class ClassroomDetailSerializer(serializers.ModelSerializer):
@@ -62,3 +62,17 @@ class ClassroomDetailSerializer(serializers.ModelSerializer):
         model = Classroom
         fields = ['id', 'subject', 'classroom_type', 'students', 'tutor']
 
+
+class ClassroomRosterBulkSerializer(serializers.Serializer):
+    ACTIONS = ['add', 'remove', 'replace']
+
+    action = serializers.ChoiceField(choices=ACTIONS)
+    student_usernames = serializers.ListField(child=serializers.CharField(), required=False, default=list, max_length=5000)
+    student_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list, max_length=5000)
+
+    def validate(self, attrs):
+        # An empty replace clears the roster; add and remove need someone.
+        if attrs['action'] != 'replace' and not (attrs['student_usernames'] or attrs['student_ids']):
+            raise serializers.ValidationError("Provide student_usernames or student_ids.")
+        return attrs
+
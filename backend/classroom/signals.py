@@ -0,0 +1,52 @@
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from students.models import Student
+from tutors.models import Tutor
+
+from .detail import invalidate_classroom_details
+from .models import Classroom
+
+
+@receiver(post_save, sender=Classroom)
+@receiver(post_delete, sender=Classroom)
+def classroom_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_classroom_details([instance.pk])
+
+
+@receiver(m2m_changed, sender=Classroom.students.through)
+def classroom_students_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_classroom_details([instance.pk])
+    elif pk_set is not None:
+        invalidate_classroom_details(pk_set)
+    else:
+        # student.classrooms.clear(): pre_clear still sees the classrooms.
+        invalidate_classroom_details(instance.classrooms.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Tutor)
+def tutor_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_classroom_details(Classroom.objects.filter(tutor=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Student)
+def student_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_classroom_details(instance.classrooms.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Names and usernames are part of the detail; logins only touch last_login.
+    if raw or set(update_fields or ()) == {'last_login'}:
+        return
+    invalidate_classroom_details(Classroom.objects.filter(
+        Q(tutor__user=instance) | Q(students__user=instance)
+    ).values_list('pk', flat=True).distinct())
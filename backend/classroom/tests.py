@@ -1,3 +1,107 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from core.testing import LOCMEM_CACHE, make_classroom, make_student, make_tutor
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ClassroomRosterBulkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tutor = make_tutor()
+        self.students = [make_student(f'student{i}') for i in range(4)]
+        self.classroom = make_classroom(self.tutor, self.students[:2])
+        self.url = f'/api/classroom/{self.classroom.id}/students/bulk/'
+        self.client = APIClient()
+        self.client.force_authenticate(self.tutor.user)
+
+    def roster(self):
+        return set(self.classroom.students.values_list('user__username', flat=True))
+
+    def post(self, data, client=None):
+        return (client or self.client).post(self.url, data, format='json')
+
+    def test_add(self):
+        response = self.post({'action': 'add', 'student_usernames': ['student1', 'student2'],
+                              'student_ids': [self.students[3].id]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'added': 2, 'removed': 0, 'students': 4})
+        self.assertEqual(self.roster(), {'student0', 'student1', 'student2', 'student3'})
+
+    def test_remove(self):
+        response = self.post({'action': 'remove', 'student_usernames': ['student0', 'student2']})
+        self.assertEqual(response.data, {'added': 0, 'removed': 1, 'students': 1})
+        self.assertEqual(self.roster(), {'student1'})
+
+    def test_replace(self):
+        response = self.post({'action': 'replace', 'student_usernames': ['student1', 'student2']})
+        self.assertEqual(response.data, {'added': 1, 'removed': 1, 'students': 2})
+        self.assertEqual(self.roster(), {'student1', 'student2'})
+
+    def test_empty_replace_clears(self):
+        response = self.post({'action': 'replace'})
+        self.assertEqual(response.data, {'added': 0, 'removed': 2, 'students': 0})
+
+    def test_add_needs_students(self):
+        self.assertEqual(self.post({'action': 'add'}).status_code, 400)
+
+    def test_unknown_students_change_nothing(self):
+        response = self.post({'action': 'replace', 'student_usernames': ['student2', 'typo'], 'student_ids': [0]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'not_found': {'student_usernames': ['typo'], 'student_ids': [0]}})
+        self.assertEqual(self.roster(), {'student0', 'student1'})
+
+    def test_other_tutors_classroom(self):
+        client = APIClient()
+        client.force_authenticate(make_tutor('other').user)
+        self.assertEqual(self.post({'action': 'replace'}, client).status_code, 404)
+        self.assertEqual(self.roster(), {'student0', 'student1'})
+
+    def test_students_cannot_manage_rosters(self):
+        client = APIClient()
+        client.force_authenticate(self.students[0].user)
+        self.assertEqual(self.post({'action': 'replace'}, client).status_code, 403)
+
+    def test_invalidates_cached_detail(self):
+        detail_url = f'/api/classroom/{self.classroom.id}/'
+        self.assertEqual(len(self.client.get(detail_url).data['students']), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post({'action': 'add', 'student_usernames': ['student2']})
+        self.assertEqual(len(self.client.get(detail_url).data['students']), 3)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ClassroomDetailTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tutor = make_tutor()
+        self.student = make_student()
+        self.classroom = make_classroom(self.tutor, [self.student], classroom_type='individual')
+        self.url = f'/api/classroom/{self.classroom.id}/'
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+
+    def test_cached(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_outsider(self):
+        client = APIClient()
+        client.force_authenticate(make_student('outsider').user)
+        self.assertEqual(client.get(self.url).status_code, 404)
+
+    def test_name_change_invalidates(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tutor.user.first_name = 'Ada'
+            self.tutor.user.save()
+        self.assertEqual(self.client.get(self.url).data['tutor']['first_name'], 'Ada')
+
+    def test_removed_student_loses_access(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.classroom.students.remove(self.student)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
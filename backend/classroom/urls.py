@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import ClassroomCreateView, ClassroomView, ClassroomDetailView
+from .views import ClassroomCreateView, ClassroomView, ClassroomDetailView, ClassroomRosterBulkView
 
 urlpatterns = [
     path('register/', ClassroomCreateView.as_view()),
     path("all/", ClassroomView.as_view()),
-    path('<int:classroom_id>/', ClassroomDetailView.as_view())
+    path('<int:classroom_id>/', ClassroomDetailView.as_view()),
+    path('<int:classroom_id>/students/bulk/', ClassroomRosterBulkView.as_view()),
 ]
@@ -2,18 +2,24 @@ from rest_framework.generics import CreateAPIView, ListAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from .models import Classroom
-from .serializers import ClassroomSerializer, ClassroomDetailSerializer
+from .serializers import ClassroomSerializer, ClassroomRosterBulkSerializer
+from .roster import change_roster, resolve_students
+from .detail import get_classroom_detail
 from tutors.models import Tutor
 from students.models import Student
-from rest_framework.exceptions import NotFound
+from rest_framework import status
+from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework.response import Response
+from django.db import transaction
 class ClassroomCreateView(CreateAPIView):
     queryset = Classroom.objects.all()
     serializer_class = ClassroomSerializer
     permission_classes = [IsAuthenticated]
 
     def perform_create(self, serializer):
-        tutor = Tutor.objects.get(user=self.request.user)
+        tutor = self.request.profile
+        if not isinstance(tutor, Tutor):
+            raise PermissionDenied("Only tutors can create classrooms")
         serializer.save(tutor=tutor)
 
 class ClassroomView(ListAPIView):
@@ -21,36 +27,74 @@ class ClassroomView(ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        tutor = Tutor.objects.filter(user=self.request.user).first()
-        if not tutor:
-            student = Student.objects.filter(user=self.request.user).first()
-            return Classroom.objects.filter(students=student)
-        return Classroom.objects.filter(tutor=tutor)
+        profile = self.request.profile
+        if isinstance(profile, Tutor):
+            classrooms = Classroom.objects.filter(tutor=profile)
+        elif isinstance(profile, Student):
+            classrooms = Classroom.objects.filter(students=profile)
+        else:
+            return Classroom.objects.none()
+        return classrooms.prefetch_related('students')
     
 class ClassroomDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        user = self.request.user
-        try:
-            tutor = Tutor.objects.get(user=user)
-        except Tutor.DoesNotExist:
-            try: 
-                student = Student.objects.get(user=user)
-            except Student.DoesNotExist:
-                raise NotFound("not student nor tutor of this classroom")
-  
-        
-        classroom_id = self.kwargs.get('classroom_id')
-        try:
-            classroom = Classroom.objects.get(id=classroom_id)
-        except Classroom.DoesNotExist:
+        profile = self.request.profile
+        if not profile:
+            raise NotFound("not student nor tutor of this classroom")
+
+        data = get_classroom_detail(self.kwargs.get('classroom_id'))
+        if data is None:
             raise NotFound('Such classroom does not exist')
-        
-        serializer = ClassroomDetailSerializer(classroom)
 
-        return Response(serializer.data)
+        # Membership is checked against the cached roster, no extra query.
+        if isinstance(profile, Tutor):
+            is_member = data['tutor']['id'] == profile.id
+        else:
+            is_member = any(student['id'] == profile.id for student in data['students'])
+        if not is_member:
+            raise NotFound("not student nor tutor of this classroom")
+
+        return Response(data)
+
+
+class ClassroomRosterBulkView(APIView):
+    """
+    Adds, removes or replaces many students of a classroom at once, by
+    username and/or Student id, in one transaction. If any entry is unknown
+    nothing is changed and they are reported back with a 400, so a typo
+    can't turn a replace into dropping students.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        tutor = self.request.profile
+        if not isinstance(tutor, Tutor):
+            raise PermissionDenied("Only tutors can manage classroom rosters")
+
+        payload = ClassroomRosterBulkSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        data = payload.validated_data
 
+        student_ids, missing_usernames, missing_ids = resolve_students(data['student_usernames'], data['student_ids'])
 
+        with transaction.atomic():
+            # The row lock serializes concurrent roster changes of this classroom.
+            classroom = Classroom.objects.select_for_update().filter(id=self.kwargs['classroom_id'], tutor=tutor).first()
+            if classroom is None:
+                raise NotFound('Such classroom does not exist')
+            if missing_usernames or missing_ids:
+                return Response(
+                    {'not_found': {'student_usernames': missing_usernames, 'student_ids': missing_ids}},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            added, removed = change_roster(classroom, data['action'], student_ids)
+            total = Classroom.students.through.objects.filter(classroom=classroom).count()
 
+        return Response({
+            'added': len(added),
+            'removed': len(removed),
+            'students': total,
+        })
 
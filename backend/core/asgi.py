@@ -9,13 +9,31 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 django.setup()
 
 import chat.routing
+import homeworks.routing
 from chat.middleware import TicketAuthMiddlewareStack
+from chat.persistence import message_buffer
+from channels.db import database_sync_to_async
+from core.db_pool import close_pools
+
+
+async def lifespan(scope, receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            # Don't lose write-behind chat messages on deploys/restarts.
+            await message_buffer.flush()
+            await database_sync_to_async(close_pools)()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
 
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
+    "lifespan": lifespan,
     "websocket": TicketAuthMiddlewareStack(
         URLRouter(
-            chat.routing.websocket_urlpatterns
+            chat.routing.websocket_urlpatterns + homeworks.routing.websocket_urlpatterns
         )
     ),
 })
@@ -0,0 +1,41 @@
+from django.db import connections
+
+# psycopg_pool ConnectionPool.get_stats() keys: current state...
+POOL_GAUGES = ('pool_min', 'pool_max', 'pool_size', 'pool_available', 'requests_waiting')
+# ...and totals since the pool was created (only present once non-zero).
+POOL_COUNTERS = (
+    'requests_num', 'requests_queued', 'requests_wait_ms', 'requests_errors',
+    'connections_num', 'connections_ms', 'connections_errors', 'connections_lost',
+    'returns_bad', 'usage_ms',
+)
+
+
+def pool_stats():
+    """Connection pool statistics of every pooled database, per alias."""
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            current = pool.get_stats()
+            stats[alias] = {key: current.get(key, 0) for key in POOL_GAUGES + POOL_COUNTERS}
+    return stats
+
+
+def render_prometheus():
+    stats = pool_stats()
+    if not stats:
+        return ""
+    lines = []
+    for key in POOL_GAUGES + POOL_COUNTERS:
+        name = 'tutorhub_db_' + (key if key.startswith('pool_') else f'pool_{key}')
+        lines.append(f"# TYPE {name} {'gauge' if key in POOL_GAUGES else 'counter'}")
+        for alias, values in stats.items():
+            lines.append(f'{name}{{alias="{alias}"}} {values[key]}')
+    return "\n".join(lines) + "\n"
+
+
+def close_pools():
+    for alias in connections:
+        close_pool = getattr(connections[alias], 'close_pool', None)
+        if close_pool is not None:
+            close_pool()
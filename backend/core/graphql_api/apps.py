@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class GraphqlApiConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core.graphql_api'
+    label = 'graphql_api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+
+from chat.membership import get_members_of
+from chat.models import Participant
+from classroom.models import Classroom
+from homeworks.models import HomeworkSubmission
+from students.models import Student
+from tutors.models import Tutor
+
+# Bumped by invalidate_all, for changes that can show up in anybody's results.
+GLOBAL_VERSION_KEY = 'graphql_version'
+
+
+def _viewer_key(model, profile_id):
+    return f"graphql_version_{model._meta.model_name}_{profile_id}"
+
+
+def _viewer_versions(profile):
+    """
+    The global and per-viewer version tokens that cached responses are keyed
+    on. A missing token is created rather than defaulted, so an evicted
+    version can never bring back entries stored under an older one.
+    """
+    keys = [GLOBAL_VERSION_KEY, _viewer_key(type(profile), profile.pk)]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+    return ':'.join(str(versions[key]) for key in keys)
+
+
+def response_cache_key(profile, query_hash, operation_name, variables):
+    parts = [
+        _viewer_versions(profile),
+        query_hash,
+        operation_name or '',
+        json.dumps(variables or {}, sort_keys=True, default=str),
+    ]
+    return 'graphql_response_' + hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+
+def get_cached_response(key):
+    return cache.get(key)
+
+
+def set_cached_response(key, data):
+    cache.set(key, data, timeout=settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT)
+
+
+def _bump(keys):
+    keys = set(keys)
+    if keys:
+        # After commit, so nobody can cache the old rows again under the new version.
+        transaction.on_commit(lambda: cache.set_many({key: uuid.uuid4().hex for key in keys}, timeout=None))
+
+
+def invalidate_viewers(tutor_ids=(), student_ids=()):
+    _bump(
+        [_viewer_key(Tutor, pk) for pk in tutor_ids]
+        + [_viewer_key(Student, pk) for pk in student_ids]
+    )
+
+
+def invalidate_profile(profile):
+    if isinstance(profile, Tutor):
+        invalidate_viewers(tutor_ids=[profile.pk])
+    elif isinstance(profile, Student):
+        invalidate_viewers(student_ids=[profile.pk])
+
+
+def invalidate_all():
+    _bump([GLOBAL_VERSION_KEY])
+
+
+def invalidate_classrooms(classroom_ids):
+    """Drops cached responses of the tutors and students of these classrooms."""
+    tutor_ids = Classroom.objects.filter(pk__in=classroom_ids).values_list('tutor_id', flat=True)
+    student_ids = Classroom.students.through.objects.filter(
+        classroom_id__in=classroom_ids,
+    ).values_list('student_id', flat=True)
+    invalidate_viewers(tutor_ids=list(tutor_ids), student_ids=list(student_ids))
+
+
+def invalidate_submissions(submission_ids):
+    """Submissions are only visible to their student and the classroom's tutor."""
+    rows = list(HomeworkSubmission.objects.filter(pk__in=submission_ids).values_list(
+        'student_id', 'homework__classroom__tutor_id',
+    ))
+    invalidate_viewers(
+        tutor_ids={tutor_id for _student_id, tutor_id in rows},
+        student_ids={student_id for student_id, _tutor_id in rows},
+    )
+
+
+def invalidate_conversations(conversation_ids):
+    """
+    Drops cached responses of every participant of these conversations,
+    found through the cached member sets of chat.membership.
+    """
+    members = set().union(*get_members_of(conversation_ids).values())
+    tutor_type = ContentType.objects.get_for_model(Tutor).id
+    invalidate_viewers(
+        tutor_ids={pk for content_type_id, pk in members if content_type_id == tutor_type},
+        student_ids={pk for content_type_id, pk in members if content_type_id != tutor_type},
+    )
+
+
+def invalidate_profile_appearances(profile):
+    """
+    Drops the cached responses that can show this profile's names: its
+    own and those of its classrooms and conversations.
+    """
+    if isinstance(profile, Tutor):
+        classroom_ids = Classroom.objects.filter(tutor=profile).values_list('pk', flat=True)
+    else:
+        classroom_ids = Classroom.students.through.objects.filter(student=profile).values_list('classroom_id', flat=True)
+    conversation_ids = Participant.objects.filter(
+        user_content_type=ContentType.objects.get_for_model(profile), user_object_id=profile.pk,
+    ).values_list('conversation_id', flat=True)
+    invalidate_profile(profile)
+    invalidate_classrooms(list(classroom_ids))
+    invalidate_conversations(list(conversation_ids))
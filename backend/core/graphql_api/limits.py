@@ -0,0 +1,102 @@
+from django.conf import settings
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    GraphQLNonNull,
+    InlineFragmentNode,
+    IntValueNode,
+    OperationType,
+    ValidationRule,
+    VariableNode,
+    get_named_type,
+)
+
+# List arguments the schema reads as page sizes; see types.page_size.
+PAGE_SIZE_ARGUMENTS = ('first', 'last')
+
+
+def _is_list(field_type):
+    if isinstance(field_type, GraphQLNonNull):
+        field_type = field_type.of_type
+    return isinstance(field_type, GraphQLList)
+
+
+def _list_size(field, node):
+    """How many items a list field is assumed to return, for costing."""
+    for argument in node.arguments:
+        if argument.name.value not in PAGE_SIZE_ARGUMENTS:
+            continue
+        if isinstance(argument.value, IntValueNode):
+            return min(int(argument.value.value), settings.GRAPHQL_MAX_PAGE_SIZE)
+        if isinstance(argument.value, VariableNode):
+            return settings.GRAPHQL_MAX_PAGE_SIZE
+    for name in PAGE_SIZE_ARGUMENTS:
+        if name in field.args and isinstance(field.args[name].default_value, int):
+            return field.args[name].default_value
+    return settings.GRAPHQL_LIST_SIZE_ESTIMATE
+
+
+class QueryLimitsRule(ValidationRule):
+    """
+    Rejects operations nested deeper than GRAPHQL_MAX_DEPTH or costing more
+    than GRAPHQL_MAX_COST before anything is executed. Every object field
+    costs one, multiplied by the expected size of each list above it.
+    """
+
+    def enter_operation_definition(self, node, *_args):
+        schema = self.context.schema
+        root_type = {
+            OperationType.QUERY: schema.query_type,
+            OperationType.MUTATION: schema.mutation_type,
+            OperationType.SUBSCRIPTION: schema.subscription_type,
+        }[node.operation]
+        if root_type is None:
+            return
+        depth, cost = self._measure(node.selection_set, root_type, 0, frozenset())
+        if depth > settings.GRAPHQL_MAX_DEPTH:
+            self.report_error(GraphQLError(
+                f"Query depth {depth} exceeds the maximum of {settings.GRAPHQL_MAX_DEPTH}.", node,
+            ))
+        if cost > settings.GRAPHQL_MAX_COST:
+            self.report_error(GraphQLError(
+                f"Query cost {cost} exceeds the maximum of {settings.GRAPHQL_MAX_COST}.", node,
+            ))
+
+    def _measure(self, selection_set, parent_type, depth, fragments):
+        max_depth, cost = depth, 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                if selection.selection_set is None or selection.name.value.startswith('__'):
+                    continue
+                field = getattr(parent_type, 'fields', {}).get(selection.name.value)
+                if field is None:
+                    # Unknown fields are reported by the standard rules.
+                    continue
+                child_depth, child_cost = self._measure(
+                    selection.selection_set, get_named_type(field.type), depth + 1, fragments,
+                )
+                size = _list_size(field, selection) if _is_list(field.type) else 1
+                max_depth = max(max_depth, child_depth)
+                cost += size * (1 + child_cost)
+            else:
+                seen = fragments
+                if isinstance(selection, FragmentSpreadNode):
+                    name = selection.name.value
+                    fragment = self.context.get_fragment(name)
+                    if fragment is None or name in fragments:
+                        # Missing or cyclic; the standard rules report both.
+                        continue
+                    seen = fragments | {name}
+                elif isinstance(selection, InlineFragmentNode):
+                    fragment = selection
+                else:
+                    continue
+                fragment_type = parent_type
+                if fragment.type_condition is not None:
+                    fragment_type = self.context.schema.get_type(fragment.type_condition.name.value) or parent_type
+                child_depth, child_cost = self._measure(fragment.selection_set, fragment_type, depth, seen)
+                max_depth = max(max_depth, child_depth)
+                cost += child_cost
+        return max_depth, cost
@@ -0,0 +1,108 @@
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from graphene.utils.dataloader import DataLoader
+
+from chat.models import Message, Participant
+from classroom.models import Classroom
+from homeworks.models import HomeworkClassroomAssign, HomeworkComments, HomeworkSubmission
+from students.models import Student
+from tutors.models import Tutor
+
+
+class QueryLoader(DataLoader):
+    """
+    Collects the keys requested during one tick of the event loop and hands
+    them to `fetch`, a synchronous function run on the request thread that
+    answers all of them with a single query.
+    """
+
+    def __init__(self, fetch):
+        self._fetch = sync_to_async(fetch)
+        super().__init__()
+
+    async def batch_load_fn(self, keys):
+        return await self._fetch(list(keys))
+
+
+def _by_id(queryset):
+    def fetch(ids):
+        objects = queryset.in_bulk(ids)
+        return [objects.get(pk) for pk in ids]
+    return fetch
+
+
+def _grouped(queryset, field, value=None):
+    def fetch(keys):
+        groups = defaultdict(list)
+        for obj in queryset.filter(**{f'{field}__in': keys}):
+            groups[getattr(obj, field)].append(value(obj) if value else obj)
+        return [groups[key] for key in keys]
+    return fetch
+
+
+def _latest_messages(limit):
+    def fetch(conversation_ids):
+        # One query for every conversation: number each conversation's
+        # messages newest first and keep the first `limit` of each.
+        ranked = Message.objects.filter(conversation_id__in=conversation_ids).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F('conversation_id'),
+                order_by=[F('timestamp').desc(), F('id').desc()],
+            ),
+        ).filter(position__lte=limit).order_by('conversation_id', 'timestamp', 'id')
+        groups = defaultdict(list)
+        for message in ranked:
+            groups[message.conversation_id].append(message)
+        return [groups[key] for key in conversation_ids]
+    return fetch
+
+
+class Loaders:
+    """
+    The DataLoaders of one GraphQL request. Results are cached for the
+    lifetime of the request only, and everything reachable from the
+    viewer's own classrooms and conversations is loaded through here.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.tutor = QueryLoader(_by_id(Tutor.objects.select_related('user')))
+        self.student = QueryLoader(_by_id(Student.objects.select_related('user')))
+        self.classroom = QueryLoader(_by_id(Classroom.objects.all()))
+        self.homework = QueryLoader(_by_id(HomeworkClassroomAssign.objects.all()))
+        self.classroom_students = QueryLoader(_grouped(
+            Classroom.students.through.objects.select_related('student__user').order_by('student_id'),
+            'classroom_id', value=lambda row: row.student,
+        ))
+        self.classroom_homeworks = QueryLoader(_grouped(
+            HomeworkClassroomAssign.objects.order_by('due_date', 'id'), 'classroom_id',
+        ))
+        submissions = HomeworkSubmission.objects.order_by('student_id')
+        if isinstance(profile, Student):
+            submissions = submissions.filter(student=profile)
+        self.homework_submissions = QueryLoader(_grouped(submissions, 'homework_id'))
+        self.homework_comments = QueryLoader(_grouped(HomeworkComments.objects.order_by('id'), 'homework_id'))
+        self.conversation_participants = QueryLoader(_grouped(
+            Participant.objects.order_by('id'), 'conversation_id',
+        ))
+        self._messages = {}
+        # Resolved here, on the request thread: the content type cache may
+        # still need a query, which resolvers running in the loop can't make.
+        self._profiles = {
+            ContentType.objects.get_for_model(Tutor).id: self.tutor,
+            ContentType.objects.get_for_model(Student).id: self.student,
+        }
+
+    def messages(self, limit):
+        if limit not in self._messages:
+            self._messages[limit] = QueryLoader(_latest_messages(limit))
+        return self._messages[limit]
+
+    def profile_by_generic_key(self, content_type_id, object_id):
+        """Loads the Tutor or Student behind a (content type, object id) pair."""
+        return self._profiles[content_type_id].load(object_id)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from graphql import OperationDefinitionNode
+
+from core.graphql_api.persisted import persisted_queries, prepare_document
+
+
+class Command(BaseCommand):
+    help = "Validates the persisted GraphQL queries and prints the sha256 hash clients send for each."
+
+    def handle(self, *args, **options):
+        for sha256_hash, query in persisted_queries().items():
+            document, _errors = prepare_document(query)
+            names = [
+                definition.name.value if definition.name else '(anonymous)'
+                for definition in document.definitions
+                if isinstance(definition, OperationDefinitionNode)
+            ]
+            self.stdout.write(f"{sha256_hash}  {', '.join(names)}")
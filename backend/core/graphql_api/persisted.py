@@ -0,0 +1,52 @@
+import hashlib
+from functools import cache, lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from graphql import GraphQLError, parse, specified_rules, validate
+
+from .limits import QueryLimitsRule
+
+VALIDATION_RULES = (*specified_rules, QueryLimitsRule)
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+@lru_cache(maxsize=128)
+def prepare_document(query):
+    """
+    Parses and validates a query once per process; returns the document and
+    a tuple of errors. Validation only depends on the schema and the limit
+    settings, so the outcome can be reused for every later request.
+    """
+    from .schema import schema
+
+    try:
+        document = parse(query)
+    except GraphQLError as exc:
+        return None, (exc,)
+    return document, tuple(validate(schema.graphql_schema, document, VALIDATION_RULES))
+
+
+@cache
+def persisted_queries():
+    """
+    Maps the sha256 of every `.graphql` file in GRAPHQL_PERSISTED_QUERIES_DIR
+    to its text. Each document is parsed and validated while loading, so a
+    broken file fails the first request instead of the clients sending it.
+    """
+    queries = {}
+    for path in sorted(Path(settings.GRAPHQL_PERSISTED_QUERIES_DIR).glob('*.graphql')):
+        query = path.read_text()
+        _document, errors = prepare_document(query)
+        if errors:
+            raise ImproperlyConfigured(f"Persisted query {path.name} is invalid: {errors[0].message}")
+        queries[query_hash(query)] = query
+    return queries
+
+
+def persisted_query(sha256_hash):
+    return persisted_queries().get(sha256_hash)
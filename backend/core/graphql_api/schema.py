@@ -0,0 +1,71 @@
+import graphene
+from asgiref.sync import sync_to_async
+from graphql import GraphQLError
+
+from chat.models import Conversation
+from classroom.models import Classroom
+from homeworks.models import HomeworkClassroomAssign
+from students.models import Student
+from tutors.models import Tutor
+
+from .types import ClassroomType, ConversationType, HomeworkType, ViewerType, page_size
+
+
+def _viewer(info):
+    profile = info.context.profile
+    if not isinstance(profile, (Tutor, Student)):
+        raise GraphQLError("Authentication credentials were not provided.")
+    return profile
+
+
+def _visible_classrooms(profile):
+    if isinstance(profile, Tutor):
+        return Classroom.objects.filter(tutor=profile)
+    return Classroom.objects.filter(students=profile)
+
+
+def _prime(loader, objects):
+    for obj in objects:
+        loader.prime(obj.pk, obj)
+    return objects
+
+
+class Query(graphene.ObjectType):
+    me = graphene.Field(ViewerType, required=True)
+    classrooms = graphene.List(graphene.NonNull(ClassroomType), required=True)
+    classroom = graphene.Field(ClassroomType, id=graphene.ID(required=True))
+    homework = graphene.Field(HomeworkType, id=graphene.ID(required=True))
+    conversations = graphene.List(
+        graphene.NonNull(ConversationType), required=True,
+        first=graphene.Int(default_value=20),
+        description="The viewer's conversations, most recently active first.",
+    )
+    conversation = graphene.Field(ConversationType, id=graphene.UUID(required=True))
+
+    def resolve_me(root, info):
+        return _viewer(info)
+
+    async def resolve_classrooms(root, info):
+        classrooms = _visible_classrooms(_viewer(info)).order_by('id')
+        return _prime(info.context.loaders.classroom, await sync_to_async(list)(classrooms))
+
+    async def resolve_classroom(root, info, id):
+        classrooms = _visible_classrooms(_viewer(info)).filter(pk=id)
+        return next(iter(_prime(info.context.loaders.classroom, await sync_to_async(list)(classrooms))), None)
+
+    async def resolve_homework(root, info, id):
+        homeworks = HomeworkClassroomAssign.objects.filter(
+            pk=id, classroom__in=_visible_classrooms(_viewer(info)),
+        )
+        return next(iter(_prime(info.context.loaders.homework, await sync_to_async(list)(homeworks))), None)
+
+    async def resolve_conversations(root, info, first):
+        conversations = Conversation.objects.inbox_for(_viewer(info))[:page_size(first)]
+        return await sync_to_async(list)(conversations)
+
+    async def resolve_conversation(root, info, id):
+        conversations = Conversation.objects.inbox_for(_viewer(info)).filter(pk=id)
+        return next(iter(await sync_to_async(list)(conversations)), None)
+
+
+schema = graphene.Schema(query=Query)
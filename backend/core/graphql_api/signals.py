@@ -0,0 +1,100 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from chat.models import Participant
+from classroom.models import Classroom
+from homeworks.models import HomeworkClassroomAssign, HomeworkComments, HomeworkSubmission
+from students.models import Student
+from tutors.models import Tutor
+
+from auth_app.profiles import get_profile
+
+from .cache import (
+    invalidate_classrooms,
+    invalidate_conversations,
+    invalidate_profile_appearances,
+    invalidate_submissions,
+    invalidate_viewers,
+)
+
+
+@receiver(post_save, sender=Classroom)
+@receiver(pre_delete, sender=Classroom)
+def classroom_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_classrooms([instance.pk])
+
+
+@receiver(m2m_changed, sender=Classroom.students.through)
+def classroom_students_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Students dropped from a roster are no longer found through it, so they
+    # are named explicitly; pre_clear runs while the roster is still there.
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        classroom_ids = pk_set if pk_set is not None else list(instance.classrooms.values_list('pk', flat=True))
+        invalidate_classrooms(classroom_ids)
+        invalidate_viewers(student_ids=[instance.pk])
+    else:
+        invalidate_classrooms([instance.pk])
+        invalidate_viewers(student_ids=pk_set or ())
+
+
+@receiver(post_save, sender=HomeworkClassroomAssign)
+@receiver(post_delete, sender=HomeworkClassroomAssign)
+def homework_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_classrooms([instance.classroom_id])
+
+
+@receiver(post_save, sender=HomeworkComments)
+@receiver(post_delete, sender=HomeworkComments)
+def comment_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_classrooms(
+            HomeworkClassroomAssign.objects.filter(pk=instance.homework_id).values_list('classroom_id', flat=True)
+        )
+
+
+@receiver(post_save, sender=HomeworkSubmission)
+@receiver(pre_delete, sender=HomeworkSubmission)
+def submission_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_submissions([instance.pk])
+
+
+# Messages are not watched here: the chat write paths save them in bulk and
+# call invalidate_conversations once per batch.
+@receiver(post_save, sender=Participant)
+@receiver(post_delete, sender=Participant)
+def participant_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_conversations([instance.conversation_id])
+    # A removed participant is no longer among the members.
+    model = instance.user_content_type.model_class()
+    invalidate_viewers(**{
+        'tutor_ids' if model is Tutor else 'student_ids': [instance.user_object_id],
+    })
+
+
+# A new profile or user shows up nowhere yet. Edits only reach the cached
+# responses of the profile's classrooms and conversations.
+@receiver(post_save, sender=Tutor)
+@receiver(pre_delete, sender=Tutor)
+@receiver(post_save, sender=Student)
+@receiver(pre_delete, sender=Student)
+def profile_changed(sender, instance, raw=False, created=False, **kwargs):
+    if not raw and not created:
+        invalidate_profile_appearances(instance)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    # Logins only touch last_login, which the schema doesn't expose.
+    if raw or created or set(update_fields or ()) == {'last_login'}:
+        return
+    profile = get_profile(instance)
+    if profile is not None:
+        invalidate_profile_appearances(profile)
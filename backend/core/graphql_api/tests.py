@@ -0,0 +1,112 @@
+import json
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from auth_app.tokens import ProfileRefreshToken
+from chat.models import Conversation, Message
+from core.testing import LOCMEM_CACHE, make_homework, make_student, make_tutor
+from homeworks.models import HomeworkClassroomAssign, HomeworkComments, HomeworkSubmission
+from tutors.models import Tutor
+
+from .persisted import persisted_queries
+
+DASHBOARD_HASH = '98e031295b57d082816c8f546dc072e3e882d49b1d395120cf6598be9417396a'
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class DashboardQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tutor = make_tutor()
+        self.student = make_student('student0')
+        self.tutor_type = ContentType.objects.get_for_model(Tutor)
+        self.add_classroom([self.student])
+
+    def add_classroom(self, students):
+        homework = make_homework(self.tutor, students)
+        for student in students:
+            HomeworkSubmission.objects.create(student=student, homework=homework, status='on_time')
+            conversation, _created = Conversation.objects.find_or_create_private_chat(self.tutor, student)
+            Message.objects.create(conversation=conversation, content='hi', sender_content_type=self.tutor_type,
+                                   sender_object_id=self.tutor.pk)
+        return homework
+
+    def dashboard(self, profile):
+        token = ProfileRefreshToken.for_user(profile.user).access_token
+        body = {'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': DASHBOARD_HASH}}}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/graphql', json.dumps(body), content_type='application/json',
+                                        headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertNotIn('errors', data)
+        return data['data'], len(queries)
+
+    def test_dashboard_is_persisted(self):
+        self.assertIn(DASHBOARD_HASH, persisted_queries())
+
+    def test_queries_do_not_grow_with_the_data(self):
+        cache.clear()
+        _data, few = self.dashboard(self.tutor)
+        self.add_classroom([make_student(f'student{i}') for i in range(1, 6)])
+        cache.clear()
+        data, many = self.dashboard(self.tutor)
+        self.assertEqual(len(data['classrooms']), 2)
+        self.assertEqual(len(data['conversations']), 6)
+        self.assertEqual(many, few)
+        self.assertLessEqual(few, 12)
+
+    def test_cache_hit_runs_no_queries(self):
+        first, _count = self.dashboard(self.tutor)
+        again, count = self.dashboard(self.tutor)
+        self.assertEqual(again, first)
+        self.assertEqual(count, 0)
+
+    def test_grading_invalidates_tutor_and_student(self):
+        self.dashboard(self.tutor)
+        self.dashboard(self.student)
+        submission = HomeworkSubmission.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            submission.score = 9
+            submission.save()
+        for profile in (self.tutor, self.student):
+            data, _count = self.dashboard(profile)
+            self.assertEqual(data['classrooms'][0]['homeworks'][0]['submissions'][0]['score'], 9)
+
+    def test_grading_leaves_other_viewers_cached(self):
+        other = make_student('other')
+        self.dashboard(other)
+        with self.captureOnCommitCallbacks(execute=True):
+            submission = HomeworkSubmission.objects.get()
+            submission.score = 9
+            submission.save()
+        _data, count = self.dashboard(other)
+        self.assertEqual(count, 0)
+
+    def test_comment_invalidates_classroom(self):
+        self.dashboard(self.student)
+        with self.captureOnCommitCallbacks(execute=True):
+            HomeworkComments.objects.create(homework=HomeworkClassroomAssign.objects.get(), text='hi',
+                                            user_content_type=self.tutor_type, user_object_id=self.tutor.pk)
+        _data, count = self.dashboard(self.student)
+        self.assertGreater(count, 0)
+
+    def test_rename_invalidates_classroom_tutor(self):
+        data, _count = self.dashboard(self.tutor)
+        self.assertEqual(data['classrooms'][0]['students'][0]['firstName'], '')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.user.first_name = 'Ada'
+            self.student.user.save()
+        data, _count = self.dashboard(self.tutor)
+        self.assertEqual(data['classrooms'][0]['students'][0]['firstName'], 'Ada')
+
+    def test_new_users_leave_caches_alone(self):
+        self.dashboard(self.tutor)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_student('newcomer')
+        _data, count = self.dashboard(self.tutor)
+        self.assertEqual(count, 0)
@@ -0,0 +1,192 @@
+import asyncio
+
+import graphene
+from django.conf import settings
+from graphene_django import DjangoObjectType
+
+from chat.models import Conversation, Message
+from classroom.models import Classroom
+from homeworks.models import HomeworkClassroomAssign, HomeworkComments, HomeworkSubmission
+from students.models import Student
+from tutors.models import Tutor
+
+
+def page_size(value):
+    return max(1, min(value, settings.GRAPHQL_MAX_PAGE_SIZE))
+
+
+class UserNameFields:
+    username = graphene.String(required=True)
+    first_name = graphene.String(required=True)
+    last_name = graphene.String(required=True)
+
+    # Profiles always come from the tutor/student loaders, which join the user.
+    def resolve_username(root, info):
+        return root.user.username
+
+    def resolve_first_name(root, info):
+        return root.user.first_name
+
+    def resolve_last_name(root, info):
+        return root.user.last_name
+
+
+class TutorType(UserNameFields, DjangoObjectType):
+    class Meta:
+        model = Tutor
+        name = 'Tutor'
+        fields = ('id', 'subject', 'description')
+        convert_choices_to_enum = False
+
+
+class StudentType(UserNameFields, DjangoObjectType):
+    class Meta:
+        model = Student
+        name = 'Student'
+        fields = ('id', 'grade', 'school_name')
+
+
+class Profile(graphene.Union):
+    class Meta:
+        types = (TutorType, StudentType)
+
+
+class ClassroomType(DjangoObjectType):
+    tutor = graphene.Field(TutorType, required=True)
+    students = graphene.List(graphene.NonNull(StudentType), required=True)
+    homeworks = graphene.List(graphene.NonNull(lambda: HomeworkType), required=True)
+
+    class Meta:
+        model = Classroom
+        name = 'Classroom'
+        fields = ('id', 'subject', 'classroom_type')
+        convert_choices_to_enum = False
+
+    async def resolve_tutor(root, info):
+        return await info.context.loaders.tutor.load(root.tutor_id)
+
+    async def resolve_students(root, info):
+        return await info.context.loaders.classroom_students.load(root.id)
+
+    async def resolve_homeworks(root, info):
+        loaders = info.context.loaders
+        homeworks = await loaders.classroom_homeworks.load(root.id)
+        for homework in homeworks:
+            loaders.homework.prime(homework.pk, homework)
+        return homeworks
+
+
+class HomeworkType(DjangoObjectType):
+    classroom = graphene.Field(ClassroomType, required=True)
+    assigned_by = graphene.Field(TutorType, required=True)
+    submissions = graphene.List(
+        graphene.NonNull(lambda: SubmissionType), required=True,
+        description="Every submission for the tutor; a student only sees their own.",
+    )
+    comments = graphene.List(graphene.NonNull(lambda: CommentType), required=True)
+
+    class Meta:
+        model = HomeworkClassroomAssign
+        name = 'Homework'
+        fields = ('id', 'title', 'description', 'due_date', 'created_at', 'is_optional')
+
+    async def resolve_classroom(root, info):
+        return await info.context.loaders.classroom.load(root.classroom_id)
+
+    async def resolve_assigned_by(root, info):
+        return await info.context.loaders.tutor.load(root.assigned_by_id)
+
+    async def resolve_submissions(root, info):
+        return await info.context.loaders.homework_submissions.load(root.id)
+
+    async def resolve_comments(root, info):
+        return await info.context.loaders.homework_comments.load(root.id)
+
+
+class SubmissionType(DjangoObjectType):
+    student = graphene.Field(StudentType, required=True)
+    homework = graphene.Field(HomeworkType, required=True)
+
+    class Meta:
+        model = HomeworkSubmission
+        name = 'Submission'
+        fields = ('id', 'submitted_at', 'status', 'score', 'feedback')
+        convert_choices_to_enum = False
+
+    async def resolve_student(root, info):
+        return await info.context.loaders.student.load(root.student_id)
+
+    async def resolve_homework(root, info):
+        return await info.context.loaders.homework.load(root.homework_id)
+
+
+class CommentType(DjangoObjectType):
+    author = graphene.Field(Profile)
+
+    class Meta:
+        model = HomeworkComments
+        name = 'Comment'
+        fields = ('id', 'text', 'timestamp')
+
+    async def resolve_author(root, info):
+        return await info.context.loaders.profile_by_generic_key(root.user_content_type_id, root.user_object_id)
+
+
+class MessageType(DjangoObjectType):
+    sender = graphene.Field(Profile)
+
+    class Meta:
+        model = Message
+        name = 'Message'
+        fields = ('id', 'content', 'timestamp')
+
+    async def resolve_sender(root, info):
+        return await info.context.loaders.profile_by_generic_key(root.sender_content_type_id, root.sender_object_id)
+
+
+class ConversationType(DjangoObjectType):
+    participants = graphene.List(graphene.NonNull(Profile), required=True)
+    messages = graphene.List(
+        graphene.NonNull(MessageType), required=True,
+        last=graphene.Int(default_value=50),
+        description="The latest `last` messages, oldest first.",
+    )
+    last_message = graphene.String()
+    last_activity = graphene.DateTime(required=True)
+    unread_count = graphene.Int(required=True)
+
+    class Meta:
+        model = Conversation
+        name = 'Conversation'
+        fields = ('id', 'created_at')
+
+    async def resolve_participants(root, info):
+        loaders = info.context.loaders
+        participants = await loaders.conversation_participants.load(root.id)
+        profiles = await asyncio.gather(*[
+            loaders.profile_by_generic_key(participant.user_content_type_id, participant.user_object_id)
+            for participant in participants
+        ])
+        return [profile for profile in profiles if profile is not None]
+
+    async def resolve_messages(root, info, last):
+        return await info.context.loaders.messages(page_size(last)).load(root.id)
+
+
+class ViewerType(graphene.ObjectType):
+    username = graphene.String(required=True)
+    role = graphene.String(required=True)
+    profile = graphene.Field(Profile, required=True)
+
+    class Meta:
+        name = 'Viewer'
+
+    def resolve_username(root, info):
+        return info.context.user.username
+
+    def resolve_role(root, info):
+        return 'tutor' if isinstance(root, Tutor) else 'student'
+
+    async def resolve_profile(root, info):
+        loader = info.context.loaders.tutor if isinstance(root, Tutor) else info.context.loaders.student
+        return await loader.load(root.pk)
@@ -0,0 +1,121 @@
+import json
+from inspect import isawaitable
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.http import HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from graphene_django.views import GraphQLView, HttpError
+from graphql import ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast
+from rest_framework.exceptions import AuthenticationFailed
+
+from auth_app.authentication import StatelessProfileJWTAuthentication
+from auth_app.profiles import get_profile
+
+from .cache import get_cached_response, response_cache_key, set_cached_response
+from .loaders import Loaders
+from .persisted import VALIDATION_RULES, persisted_query, prepare_document, query_hash
+
+
+async def _complete(result):
+    return await result
+
+
+def _persisted_query_hash(request, data):
+    """The sha256Hash of an Apollo-style `persistedQuery` extension, if any."""
+    extensions = request.GET.get('extensions') or data.get('extensions')
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            raise HttpError(HttpResponseBadRequest("Extensions are not valid JSON."))
+    if not isinstance(extensions, dict):
+        return None
+    persisted = extensions.get('persistedQuery')
+    return persisted.get('sha256Hash') if isinstance(persisted, dict) else None
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ProfileGraphQLView(GraphQLView):
+    """
+    GraphQLView authenticated with the API's JWT bearer tokens. Resolvers
+    are coroutines batched through per-request DataLoaders, so execution is
+    driven to completion on an event loop before the response is built.
+
+    Clients may send the sha256 of a query registered in
+    GRAPHQL_PERSISTED_QUERIES_DIR instead of its text. Parsed and validated
+    documents are reused across requests, and successful results are cached
+    per viewer until a signal in .signals invalidates them.
+    """
+    validation_rules = VALIDATION_RULES
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            authenticated = StatelessProfileJWTAuthentication().authenticate(request)
+        except AuthenticationFailed as exc:
+            detail = exc.detail.get('detail', exc.default_detail) if isinstance(exc.detail, dict) else exc.detail
+            return JsonResponse({'errors': [{'message': str(detail)}]}, status=401)
+        if authenticated is not None:
+            request.user = authenticated[0]
+        request.profile = get_profile(request.user)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_context(self, request):
+        request.loaders = Loaders(request.profile)
+        return request
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        sha256_hash = _persisted_query_hash(request, data)
+        if sha256_hash and not query:
+            query = persisted_query(sha256_hash)
+            if query is None:
+                return ExecutionResult(errors=[GraphQLError(
+                    "PersistedQueryNotFound", extensions={'code': 'PERSISTED_QUERY_NOT_FOUND'},
+                )])
+        if not query:
+            return super().execute_graphql_request(request, data, query, variables, operation_name, show_graphiql)
+
+        document, errors = prepare_document(query)
+        if errors:
+            return ExecutionResult(data=None, errors=list(errors))
+
+        operation_ast = get_operation_ast(document, operation_name)
+        if operation_ast is not None and operation_ast.operation != OperationType.QUERY:
+            if request.method.lower() == 'get':
+                if show_graphiql:
+                    return None
+                raise HttpError(HttpResponseNotAllowed(
+                    ['POST'], f"Can only perform a {operation_ast.operation.value} operation from a POST request.",
+                ))
+
+        cache_key = None
+        if (
+            settings.GRAPHQL_RESPONSE_CACHE_TIMEOUT
+            and request.profile
+            and operation_ast is not None
+            and operation_ast.operation == OperationType.QUERY
+        ):
+            cache_key = response_cache_key(request.profile, query_hash(query), operation_name, variables)
+            cached = get_cached_response(cache_key)
+            if cached is not None:
+                return ExecutionResult(data=cached)
+
+        try:
+            result = execute(
+                self.schema.graphql_schema,
+                document,
+                root_value=self.get_root_value(request),
+                context_value=self.get_context(request),
+                variable_values=variables,
+                operation_name=operation_name,
+                middleware=self.get_middleware(request),
+            )
+            if isawaitable(result):
+                result = async_to_sync(_complete)(result)
+        except Exception as exc:
+            return ExecutionResult(errors=[exc])
+
+        if cache_key is not None and not result.errors:
+            set_cached_response(cache_key, result.data)
+        return result
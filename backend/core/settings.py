@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -52,7 +53,8 @@ INSTALLED_APPS = [
     'classroom',
     'homeworks',
     'drf_spectacular',
-    'chat'
+    'chat',
+    'core.graphql_api',
 ]
 
 MIDDLEWARE = [
@@ -63,7 +65,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
-    "django.contrib.auth.middleware.AuthenticationMiddleware"
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "auth_app.middleware.RequestProfileMiddleware",
 ]
 
 CORS_ALLOW_CREDENTIALS = True
@@ -114,9 +117,51 @@ DATABASES = {
         'PASSWORD': os.getenv("DB_PASSWORD"),
         'HOST': os.getenv("DB_HOST"),
         'PORT': os.getenv("DB_PORT", "5432"),
+        # Without pooling, keep each thread's connection for DB_CONN_MAX_AGE
+        # seconds (0 closes it after every request) and ping it before reuse.
+        'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", "0")),
+        'CONN_HEALTH_CHECKS': os.getenv("DB_CONN_HEALTH_CHECKS", "1") == "1",
     }
 }
 
+# DB_POOL=1 switches to psycopg's connection pool (needs the psycopg-pool
+# package). Under uvicorn every sync view and database_sync_to_async call
+# borrows a connection and returns it when done, instead of opening a new
+# one; with DB_CONN_HEALTH_CHECKS the pool checks it before lending it out.
+# Sizing, per worker process:
+#   DB_POOL_MAX_SIZE >= peak concurrent HTTP requests running sync code
+#                       (each runs in its own thread)
+#                       + 1 for Channels consumers (their database_sync_to_async
+#                       calls share one thread)
+#                       + HOMEWORK_FINALIZE_WORKERS
+# and Postgres max_connections >= workers * DB_POOL_MAX_SIZE. When the pool
+# is exhausted, callers wait up to DB_POOL_TIMEOUT seconds; watch
+# tutorhub_db_pool_requests_waiting at /api/db/metrics/.
+DB_POOL = os.getenv("DB_POOL", "0") == "1"
+if DB_POOL:
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        raise ImproperlyConfigured(
+            "DB_POOL=1 needs the psycopg-pool package (pip install 'psycopg[pool]'); unset DB_POOL to run without it."
+        )
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            'max_size': int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            'timeout': float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            'max_idle': float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+            'max_lifetime': float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+        },
+    }
+
+# Connection pool stats, exported at /api/db/metrics/. When
+# DB_POOL_METRICS_TOKEN is set, scrapers must send it as X-Metrics-Token;
+# otherwise only staff users can read them.
+DB_POOL_METRICS_ENABLED = os.getenv("DB_POOL_METRICS_ENABLED", "0") == "1"
+DB_POOL_METRICS_TOKEN = os.getenv("DB_POOL_METRICS_TOKEN")
+
 
 
 # Password validation
@@ -164,14 +209,63 @@ CORS_ORIGIN_WHITELIST = ['http://localhost:5173',  "http://localhost:3000",]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'auth_app.authentication.StatelessProfileJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Access tokens carry username, email, is_staff, role and profile id, so
+# API requests are authenticated without a user query; a cache lookup per
+# request rejects logged-out tokens and deactivated users before expiry.
+
+# Bulk CSV registration (POST /api/auth/register/bulk/, manage.py import_users).
+# Each password hash takes a noticeable fraction of a second, so uploads over
+# HTTP are capped much lower than the command. Password hashing runs in this
+# many processes; 0 means one per CPU.
+USER_IMPORT_MAX_ROWS = int(os.getenv("USER_IMPORT_MAX_ROWS", "10000"))
+USER_IMPORT_HTTP_MAX_ROWS = int(os.getenv("USER_IMPORT_HTTP_MAX_ROWS", "50"))
+USER_IMPORT_HASH_WORKERS = int(os.getenv("USER_IMPORT_HASH_WORKERS", "0"))
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Resumable chunked uploads for submissions and homework attachments. An
+# upload without a new chunk for HOMEWORK_UPLOAD_EXPIRY_HOURS is deleted with
+# its part file by `manage.py prune_uploads`.
+HOMEWORK_UPLOAD_TEMP_DIR = os.getenv("HOMEWORK_UPLOAD_TEMP_DIR", str(MEDIA_ROOT / 'uploads_tmp'))
+HOMEWORK_UPLOAD_CHUNK_SIZE = int(os.getenv("HOMEWORK_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+HOMEWORK_UPLOAD_MAX_SIZE = int(os.getenv("HOMEWORK_UPLOAD_MAX_SIZE", str(1024 * 1024 * 1024)))
+HOMEWORK_UPLOAD_EXPIRY_HOURS = int(os.getenv("HOMEWORK_UPLOAD_EXPIRY_HOURS", "24"))
+
+# Deadline-surge admission control for homework submissions.
+# HOMEWORK_SUBMIT_CONCURRENCY caps in-flight submissions per homework
+# (0 disables); slots leaked by a crashed worker free themselves once no
+# submission has started for HOMEWORK_SUBMIT_SLOT_TIMEOUT seconds. Chunked-upload files are attached
+# by HOMEWORK_FINALIZE_WORKERS background threads per process.
+HOMEWORK_SUBMIT_CONCURRENCY = int(os.getenv("HOMEWORK_SUBMIT_CONCURRENCY", "20"))
+HOMEWORK_SUBMIT_SLOT_TIMEOUT = int(os.getenv("HOMEWORK_SUBMIT_SLOT_TIMEOUT", "60"))
+HOMEWORK_SUBMIT_RETRY_AFTER = int(os.getenv("HOMEWORK_SUBMIT_RETRY_AFTER", "2"))
+HOMEWORK_SUBMITTED_CACHE_TIMEOUT = int(os.getenv("HOMEWORK_SUBMITTED_CACHE_TIMEOUT", str(7 * 24 * 3600)))
+HOMEWORK_FINALIZE_WORKERS = int(os.getenv("HOMEWORK_FINALIZE_WORKERS", "2"))
+
+# How authorized homework media downloads are delivered: "" streams from
+# Django, "x-accel-redirect" hands off to nginx (internal location at
+# HOMEWORK_MEDIA_ACCEL_PREFIX aliasing MEDIA_ROOT), "x-sendfile" to Apache.
+HOMEWORK_MEDIA_SENDFILE = os.getenv("HOMEWORK_MEDIA_SENDFILE", "")
+HOMEWORK_MEDIA_ACCEL_PREFIX = os.getenv("HOMEWORK_MEDIA_ACCEL_PREFIX", "/protected-media/")
+
+# Homework notifications (comments, new assignments, grades) are pushed on
+# ws/notifications/ and kept HOMEWORK_NOTIFICATION_RETENTION_DAYS so
+# reconnecting clients can replay what they missed
+# (`manage.py prune_notifications` deletes older ones).
+HOMEWORK_NOTIFICATION_RETENTION_DAYS = int(os.getenv("HOMEWORK_NOTIFICATION_RETENTION_DAYS", "30"))
+HOMEWORK_NOTIFICATION_REPLAY_BATCH = int(os.getenv("HOMEWORK_NOTIFICATION_REPLAY_BATCH", "200"))
+# Ids are taken at insert but events only become visible at commit, so a
+# long transaction can publish an id below one the client already has.
+# Replays resend events created this many seconds before the client's last
+# one; set it above the longest transaction that creates notifications.
+HOMEWORK_NOTIFICATION_REPLAY_GRACE = int(os.getenv("HOMEWORK_NOTIFICATION_REPLAY_GRACE", "300"))
+
 
 CACHES = {
     "default": {
@@ -182,8 +276,52 @@ CACHES = {
         }
     }
 }
+# Messages older than this many days are moved to the chat archive table by
+# `manage.py archive_chat_messages`. 0 disables archiving; archived messages
+# are read back either way.
+CHAT_ARCHIVE_AFTER_DAYS = int(os.getenv("CHAT_ARCHIVE_AFTER_DAYS", "0"))
+
+# Write-behind chat persistence: broadcast first, then store messages in
+# bulk per process, at most CHAT_WRITE_BEHIND_BATCH_SIZE rows or
+# CHAT_WRITE_BEHIND_INTERVAL seconds after the first pending message. After
+# CHAT_WRITE_BEHIND_MAX_ATTEMPTS failed flushes in a row, messages are written
+# one by one and the ones that still fail go to the `chat.dead_letter` log.
+CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "0") == "1"
+CHAT_WRITE_BEHIND_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BEHIND_BATCH_SIZE", "100"))
+CHAT_WRITE_BEHIND_INTERVAL = float(os.getenv("CHAT_WRITE_BEHIND_INTERVAL", "0.5"))
+CHAT_WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("CHAT_WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+
+# How long a conversation's participant set stays cached. Entries are also
+# dropped whenever a Participant row of the conversation changes.
+CHAT_MEMBERSHIP_CACHE_TIMEOUT = int(os.getenv("CHAT_MEMBERSHIP_CACHE_TIMEOUT", "3600"))
+
+# How long a classroom's serialized detail (tutor and roster) stays cached.
+# Roster changes and profile edits drop it earlier, see classroom.signals.
+CLASSROOM_DETAIL_CACHE_TIMEOUT = int(os.getenv("CLASSROOM_DETAIL_CACHE_TIMEOUT", "3600"))
+
+# Per-stage chat latency histograms, exported at /api/chat/metrics/.
+# When CHAT_METRICS_TOKEN is set, scrapers must send it as X-Metrics-Token;
+# otherwise only staff users can read them.
+CHAT_METRICS_ENABLED = os.getenv("CHAT_METRICS_ENABLED", "0") == "1"
+CHAT_METRICS_TOKEN = os.getenv("CHAT_METRICS_TOKEN")
+
 # uvicorn core.asgi:application --host 127.0.0.1 --port 8000 --reload
 
 GRAPHENE = {
-    "SCHEMA": "django_root.schema.schema"
-}
\ No newline at end of file
+    "SCHEMA": "core.graphql_api.schema.schema"
+}
+
+# Limits checked while validating each /graphql operation. List fields cost
+# their `first`/`last` page size, or GRAPHQL_LIST_SIZE_ESTIMATE without one.
+GRAPHQL_MAX_DEPTH = int(os.getenv("GRAPHQL_MAX_DEPTH", "8"))
+GRAPHQL_MAX_COST = int(os.getenv("GRAPHQL_MAX_COST", "10000"))
+GRAPHQL_MAX_PAGE_SIZE = int(os.getenv("GRAPHQL_MAX_PAGE_SIZE", "100"))
+GRAPHQL_LIST_SIZE_ESTIMATE = int(os.getenv("GRAPHQL_LIST_SIZE_ESTIMATE", "10"))
+
+# Queries clients can send by sha256 hash alone (Apollo persisted query
+# extension); list them with `manage.py persisted_queries`.
+GRAPHQL_PERSISTED_QUERIES_DIR = os.getenv(
+    "GRAPHQL_PERSISTED_QUERIES_DIR", str(BASE_DIR / "core" / "graphql_api" / "queries")
+)
+# Seconds a viewer's successful query result stays cached; 0 turns it off.
+GRAPHQL_RESPONSE_CACHE_TIMEOUT = int(os.getenv("GRAPHQL_RESPONSE_CACHE_TIMEOUT", "300"))
\ No newline at end of file
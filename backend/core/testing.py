@@ -0,0 +1,37 @@
+"""Fixtures shared by the apps' tests."""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from classroom.models import Classroom
+from homeworks.models import HomeworkClassroomAssign
+from students.models import Student
+from tutors.models import Tutor
+
+# Lets the tests run without Redis.
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+IN_MEMORY_CHANNELS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+def make_tutor(username='tutor', **user_fields):
+    return Tutor.objects.create(user=User.objects.create_user(username, **user_fields), subject='MATH', description='')
+
+
+def make_student(username='student', **user_fields):
+    return Student.objects.create(user=User.objects.create_user(username, **user_fields), grade=7, school_name='S')
+
+
+def make_classroom(tutor, students=(), classroom_type='group'):
+    classroom = Classroom.objects.create(tutor=tutor, classroom_type=classroom_type)
+    classroom.students.add(*students)
+    return classroom
+
+
+def make_homework(tutor, students=(), classroom=None, **fields):
+    """A homework due tomorrow, in a new classroom of `students` unless one is given."""
+    fields.setdefault('title', 'Essay')
+    fields.setdefault('due_date', timezone.now() + timedelta(days=1))
+    return HomeworkClassroomAssign.objects.create(
+        classroom=classroom or make_classroom(tutor, students), assigned_by=tutor, **fields,
+    )
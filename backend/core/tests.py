@@ -0,0 +1,125 @@
+import os
+import runpy
+import sys
+import types
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import db_pool
+
+SETTINGS_FILE = Path(__file__).resolve().parent / 'settings.py'
+
+
+def load_settings(**environ):
+    with mock.patch.dict(os.environ, environ):
+        return runpy.run_path(str(SETTINGS_FILE))
+
+
+class DBPoolSettingsTests(SimpleTestCase):
+    def test_pool_off(self):
+        settings = load_settings(DB_POOL='0', DB_CONN_MAX_AGE='60')
+        self.assertEqual(settings['DATABASES']['default']['CONN_MAX_AGE'], 60)
+        self.assertNotIn('OPTIONS', settings['DATABASES']['default'])
+
+    def test_pool_options(self):
+        with mock.patch.dict(sys.modules, {'psycopg_pool': types.ModuleType('psycopg_pool')}):
+            settings = load_settings(DB_POOL='1', DB_CONN_MAX_AGE='60', DB_POOL_MAX_SIZE='25', DB_POOL_TIMEOUT='2.5')
+        database = settings['DATABASES']['default']
+        # Pooled connections are handed back after each request, never kept.
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['OPTIONS']['pool'], {
+            'min_size': 2, 'max_size': 25, 'timeout': 2.5, 'max_idle': 300.0, 'max_lifetime': 3600.0,
+        })
+
+    def test_pool_without_psycopg_pool(self):
+        with mock.patch.dict(sys.modules, {'psycopg_pool': None}):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'psycopg-pool'):
+                load_settings(DB_POOL='1')
+
+
+class FakePool:
+    def __init__(self, **stats):
+        self.stats = stats
+
+    def get_stats(self):
+        return self.stats
+
+
+class FakeConnections:
+    def __init__(self, **wrappers):
+        self.wrappers = wrappers
+
+    def __iter__(self):
+        return iter(self.wrappers)
+
+    def __getitem__(self, alias):
+        return self.wrappers[alias]
+
+
+def fake_connections():
+    return FakeConnections(
+        default=types.SimpleNamespace(pool=FakePool(pool_min=2, pool_max=10, pool_size=3, requests_num=7)),
+        replica=types.SimpleNamespace(),
+    )
+
+
+class DBPoolStatsTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(db_pool, 'connections', fake_connections())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pool_stats_skip_unpooled_aliases(self):
+        stats = db_pool.pool_stats()
+        self.assertEqual(list(stats), ['default'])
+        self.assertEqual(stats['default']['pool_size'], 3)
+        self.assertEqual(stats['default']['requests_num'], 7)
+        # Counters psycopg has not reported yet read as zero.
+        self.assertEqual(stats['default']['requests_errors'], 0)
+
+    def test_render_prometheus(self):
+        text = db_pool.render_prometheus()
+        self.assertIn('# TYPE tutorhub_db_pool_size gauge\ntutorhub_db_pool_size{alias="default"} 3\n', text)
+        self.assertIn('# TYPE tutorhub_db_pool_requests_num counter\n'
+                      'tutorhub_db_pool_requests_num{alias="default"} 7\n', text)
+        self.assertNotIn('replica', text)
+
+    def test_render_prometheus_without_pools(self):
+        with mock.patch.object(db_pool, 'connections', FakeConnections(default=types.SimpleNamespace())):
+            self.assertEqual(db_pool.render_prometheus(), '')
+
+
+@override_settings(DB_POOL_METRICS_ENABLED=True, DB_POOL_METRICS_TOKEN=None)
+class DBPoolMetricsViewTests(TestCase):
+    url = '/api/db/metrics/'
+
+    def setUp(self):
+        patcher = mock.patch.object(db_pool, 'connections', fake_connections())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_staff_only_without_token(self):
+        self.assertEqual(APIClient().get(self.url).status_code, 403)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('user'))
+        self.assertEqual(client.get(self.url).status_code, 403)
+        client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'tutorhub_db_pool_size{alias="default"} 3', response.content)
+
+    @override_settings(DB_POOL_METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(APIClient().get(self.url, HTTP_X_METRICS_TOKEN='wrong').status_code, 403)
+        response = APIClient().get(self.url, {'summary': 1}, HTTP_X_METRICS_TOKEN='secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['default']['pool_max'], 10)
+
+    @override_settings(DB_POOL_METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(APIClient().get(self.url, HTTP_X_METRICS_TOKEN='secret').status_code, 404)
@@ -23,7 +23,8 @@ from drf_spectacular.views import (
 )
 from django.conf.urls.static import static
 from django.conf import settings
-from graphene_django.views import GraphQLView
+from core.graphql_api.views import ProfileGraphQLView
+from core.views import DBPoolMetricsView
 
 
 urlpatterns = [
@@ -33,7 +34,8 @@ urlpatterns = [
     path('api/classroom/', include('classroom.urls')),
     path('api/tutors/', include('tutors.urls')),
     path('api/homeworks/', include('homeworks.urls')),
-    path(r"graphql", GraphQLView.as_view(graphiql=True)),
+    path(r"graphql", ProfileGraphQLView.as_view(graphiql=True)),
+    path('api/db/metrics/', DBPoolMetricsView.as_view(), name='db-pool-metrics'),
 
 
     # ROUTE FOR WEBSOCKET TESTS
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import db_pool
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+
+def metrics_access_denied(request, token):
+    """
+    Returns a 403 response unless the request may read metrics: scrapers
+    send `token` as X-Metrics-Token, and with no token configured only
+    staff users can read them. Returns None when access is granted.
+    """
+    if token:
+        if not constant_time_compare(request.headers.get('X-Metrics-Token', ''), token):
+            return Response({'error': 'Invalid metrics token.'}, status=status.HTTP_403_FORBIDDEN)
+    elif not request.user.is_staff:
+        return Response({'error': 'Metrics are staff-only without a metrics token.'}, status=status.HTTP_403_FORBIDDEN)
+    return None
+
+
+class DBPoolMetricsView(APIView):
+    """
+    Connection pool statistics of every pooled database (DB_POOL) in
+    Prometheus text format, or as JSON per alias with `?summary=1`.
+    Figures are per worker process.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        if not settings.DB_POOL_METRICS_ENABLED:
+            raise Http404
+
+        denied = metrics_access_denied(request, settings.DB_POOL_METRICS_TOKEN)
+        if denied is not None:
+            return denied
+
+        if request.query_params.get('summary'):
+            return Response(db_pool.pool_stats())
+        return HttpResponse(db_pool.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,122 @@
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+
+from .models import HomeworkSubmission
+from .uploads import attach_upload
+
+logger = logging.getLogger(__name__)
+
+_finalize_executor = None
+
+
+def _submitted_key(homework_id, user_id):
+    return f"hw_submitted_{homework_id}_{user_id}"
+
+
+def is_marked_submitted(homework_id, user_id):
+    return bool(cache.get(_submitted_key(homework_id, user_id)))
+
+
+def mark_submitted(homework_id, user_id):
+    cache.set(_submitted_key(homework_id, user_id), True, timeout=settings.HOMEWORK_SUBMITTED_CACHE_TIMEOUT)
+
+
+class SubmissionSlot:
+    """
+    Caps in-flight submissions per homework across all workers with a
+    counter in the shared cache. Every acquire refreshes its timeout, so the
+    counter only expires after HOMEWORK_SUBMIT_SLOT_TIMEOUT seconds without
+    a new submission, which frees slots leaked by a crashed worker.
+
+    The counter key carries a generation that changes once it has expired,
+    and a slot is released on the generation it was taken from, so a
+    request outliving the timeout can't decrement the next counter.
+    """
+
+    def __init__(self, homework_id):
+        self.generation_key = f"hw_submit_slots_{homework_id}"
+        self.key = None
+
+    def _counter_key(self, timeout):
+        generation = cache.get(self.generation_key)
+        if generation is None:
+            cache.add(self.generation_key, uuid.uuid4().hex, timeout=timeout)
+            generation = cache.get(self.generation_key)
+        return f"{self.generation_key}_{generation}"
+
+    def acquire(self):
+        limit = settings.HOMEWORK_SUBMIT_CONCURRENCY
+        if not limit:
+            return True
+        timeout = settings.HOMEWORK_SUBMIT_SLOT_TIMEOUT
+        key = self._counter_key(timeout)
+        try:
+            in_flight = cache.incr(key)
+        except ValueError:
+            # First slot of this generation.
+            in_flight = 1 if cache.add(key, 1, timeout=timeout) else cache.incr(key)
+        cache.touch(key, timeout=timeout)
+        cache.touch(self.generation_key, timeout=timeout)
+        if in_flight > limit:
+            self._decr(key)
+            return False
+        self.key = key
+        return True
+
+    def release(self):
+        if self.key is not None:
+            self._decr(self.key)
+            self.key = None
+
+    def _decr(self, key):
+        try:
+            cache.decr(key)
+        except ValueError:
+            # The generation expired; its counter went with it.
+            pass
+
+
+def finalize_submission_file(submission_id):
+    """
+    Moves a submission's pending chunked upload into its `file` field.
+    Safe to call more than once.
+    """
+    with transaction.atomic():
+        submission = HomeworkSubmission.objects.select_for_update().select_related('pending_upload').filter(
+            id=submission_id, pending_upload__isnull=False,
+        ).first()
+        if submission is None:
+            return False
+        upload = submission.pending_upload
+        submission.pending_upload = None
+        attach_upload(submission, 'file', upload)
+    return True
+
+
+def _finalize_in_background(submission_id):
+    try:
+        finalize_submission_file(submission_id)
+    except Exception:
+        logger.exception("Failed to finalize file of submission %s", submission_id)
+    finally:
+        close_old_connections()
+
+
+def queue_finalization(submission_id):
+    """
+    Runs finalize_submission_file on a small worker pool once the current
+    transaction commits. Anything left behind by a restart is picked up by
+    `manage.py finalize_submissions`.
+    """
+    global _finalize_executor
+    if _finalize_executor is None:
+        _finalize_executor = ThreadPoolExecutor(
+            max_workers=settings.HOMEWORK_FINALIZE_WORKERS,
+            thread_name_prefix='homework-finalize',
+        )
+    transaction.on_commit(lambda: _finalize_executor.submit(_finalize_in_background, submission_id))
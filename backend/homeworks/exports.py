@@ -0,0 +1,89 @@
+import csv
+import os
+import tempfile
+
+from rest_framework.exceptions import ValidationError
+
+from .models import HomeworkSubmission
+
+EXPORT_HEADER = [
+    'classroom_id', 'subject', 'homework_id', 'homework_title', 'due_date',
+    'student_id', 'username', 'first_name', 'last_name',
+    'submitted_at', 'status', 'score', 'feedback',
+]
+CSV_ROWS_PER_CHUNK = 500
+DB_CHUNK_SIZE = 2000
+FILE_BLOCK_SIZE = 64 * 1024
+
+
+def submission_export_rows(submissions):
+    """Flat export rows, read through a server-side cursor."""
+    return submissions.order_by(
+        'homework__classroom_id', 'homework__due_date', 'homework_id', 'student__user__last_name', 'student_id',
+    ).values_list(
+        'homework__classroom_id', 'homework__classroom__subject', 'homework_id', 'homework__title', 'homework__due_date',
+        'student_id', 'student__user__username', 'student__user__first_name', 'student__user__last_name',
+        'submitted_at', 'status', 'score', 'feedback',
+    ).iterator(chunk_size=DB_CHUNK_SIZE)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_chunks(rows):
+    """Yields the CSV a few hundred rows at a time."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_HEADER)
+    batch = []
+    for row in rows:
+        batch.append(writer.writerow(row))
+        if len(batch) >= CSV_ROWS_PER_CHUNK:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def xlsx_chunks(rows):
+    """
+    Writes an XLSX with openpyxl's write-only mode to a temporary file (rows
+    are flushed to disk as they are added, so memory stays flat) and yields it
+    back in blocks. Unlike the CSV, the whole workbook is written before the
+    first byte is sent; only the read-back is streamed.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ValidationError("XLSX export needs the openpyxl package installed; use file_format=csv.")
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Submissions')
+    sheet.append(EXPORT_HEADER)
+    for row in rows:
+        sheet.append([
+            value.replace(tzinfo=None) if hasattr(value, 'tzinfo') else value
+            for value in row
+        ])
+
+    handle, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(handle)
+    workbook.save(path)
+
+    def read_back():
+        try:
+            with open(path, 'rb') as source:
+                for block in iter(lambda: source.read(FILE_BLOCK_SIZE), b''):
+                    yield block
+        finally:
+            os.remove(path)
+
+    return read_back()
+
+
+def tutor_submissions(user, classroom_id=None):
+    submissions = HomeworkSubmission.objects.filter(homework__classroom__tutor__user=user)
+    if classroom_id is not None:
+        submissions = submissions.filter(homework__classroom_id=classroom_id)
+    return submissions
@@ -0,0 +1,111 @@
+from django.utils import timezone
+
+from .models import GradebookEntry, HomeworkClassroomAssign, HomeworkSubmission
+
+
+def sync_submissions(submission_ids):
+    """
+    Upserts the gradebook entries of the given submissions. Called from the
+    HomeworkSubmission post_save signal and after bulk updates, which skip
+    signals.
+    """
+    rows = HomeworkSubmission.objects.filter(id__in=submission_ids).values(
+        'id', 'student_id', 'homework_id', 'homework__classroom_id', 'status', 'score',
+    )
+    entries = [
+        GradebookEntry(
+            classroom_id=row['homework__classroom_id'],
+            student_id=row['student_id'],
+            homework_id=row['homework_id'],
+            submission_id=row['id'],
+            status=row['status'],
+            score=row['score'],
+        )
+        for row in rows
+    ]
+    if entries:
+        GradebookEntry.objects.bulk_create(
+            entries,
+            update_conflicts=True,
+            unique_fields=['submission'],
+            update_fields=['classroom', 'student', 'homework', 'status', 'score'],
+        )
+
+
+def _summary(scores, late, missing):
+    return {
+        'average': round(sum(scores) / len(scores), 2) if scores else None,
+        'graded': len(scores),
+        'late': late,
+        'missing': missing,
+    }
+
+
+def build_gradebook(classroom):
+    """
+    Students x homeworks matrix for one classroom. Each cell is the
+    submission status and score; without a submission it is `missing` once
+    a required homework is past due, `not_submitted` otherwise.
+    """
+    now = timezone.now()
+    homeworks = list(
+        HomeworkClassroomAssign.objects.filter(classroom=classroom)
+        .order_by('due_date', 'id')
+        .values('id', 'title', 'due_date', 'is_optional')
+    )
+    students = list(
+        classroom.students.select_related('user').order_by('user__last_name', 'user__first_name', 'id')
+    )
+    cells = {
+        (student_id, homework_id): (status, score)
+        for student_id, homework_id, status, score in GradebookEntry.objects.filter(
+            classroom=classroom
+        ).values_list('student_id', 'homework_id', 'status', 'score')
+    }
+
+    homework_stats = {hw['id']: {'scores': [], 'submitted': 0, 'late': 0, 'missing': 0} for hw in homeworks}
+    student_rows = []
+    for student in students:
+        grades = {}
+        scores, late, missing = [], 0, 0
+        for hw in homeworks:
+            stats = homework_stats[hw['id']]
+            cell = cells.get((student.id, hw['id']))
+            if cell:
+                status, score = cell
+                stats['submitted'] += 1
+                if status == 'late_submission':
+                    late += 1
+                    stats['late'] += 1
+                if score is not None:
+                    scores.append(score)
+                    stats['scores'].append(score)
+            else:
+                status, score = 'not_submitted', None
+                if not hw['is_optional'] and hw['due_date'] < now:
+                    status = 'missing'
+                    missing += 1
+                    stats['missing'] += 1
+            grades[hw['id']] = {'status': status, 'score': score}
+
+        student_rows.append({
+            'id': student.id,
+            'username': student.user.username,
+            'first_name': student.user.first_name,
+            'last_name': student.user.last_name,
+            'summary': _summary(scores, late, missing),
+            'grades': grades,
+        })
+
+    homework_rows = []
+    for hw in homeworks:
+        stats = homework_stats[hw['id']]
+        summary = _summary(stats['scores'], stats['late'], stats['missing'])
+        summary['submitted'] = stats['submitted']
+        homework_rows.append({**hw, 'summary': summary})
+
+    return {
+        'classroom': classroom.id,
+        'homeworks': homework_rows,
+        'students': student_rows,
+    }
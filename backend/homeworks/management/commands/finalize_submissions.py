@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from homeworks.admission import finalize_submission_file
+from homeworks.models import HomeworkSubmission
+
+
+class Command(BaseCommand):
+    help = "Attaches chunked uploads that are still pending on homework submissions."
+
+    def handle(self, *args, **options):
+        pending = HomeworkSubmission.objects.filter(
+            pending_upload__isnull=False,
+        ).values_list('id', flat=True)
+
+        finalized = 0
+        for submission_id in pending.iterator():
+            try:
+                if finalize_submission_file(submission_id):
+                    finalized += 1
+            except Exception as exc:
+                self.stderr.write(f"Submission {submission_id}: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(f"Finalized {finalized} submission files."))
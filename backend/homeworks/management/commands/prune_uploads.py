@@ -0,0 +1,39 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from homeworks.models import ChunkedUpload, HomeworkSubmission
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes chunked uploads past their expires_at, with their part files, "
+        "and part files in HOMEWORK_UPLOAD_TEMP_DIR that no upload owns."
+    )
+
+    def handle(self, *args, **options):
+        # Uploads waiting for `finalize_submissions` are not abandoned.
+        pending = HomeworkSubmission.objects.filter(pending_upload__isnull=False).values('pending_upload')
+        expired = ChunkedUpload.objects.filter(expires_at__lt=timezone.now()).exclude(id__in=pending)
+        deleted = 0
+        for upload in expired.iterator():
+            upload.temp_path.unlink(missing_ok=True)
+            upload.delete()
+            deleted += 1
+
+        # Left behind when a row was deleted without its file; only files
+        # idle for a whole expiry period, so nothing mid-write is touched.
+        orphans = 0
+        temp_dir = Path(settings.HOMEWORK_UPLOAD_TEMP_DIR)
+        if temp_dir.is_dir():
+            cutoff = time.time() - settings.HOMEWORK_UPLOAD_EXPIRY_HOURS * 3600
+            known = {f"{upload_id}.part" for upload_id in ChunkedUpload.objects.values_list('id', flat=True).iterator()}
+            for path in temp_dir.glob('*.part'):
+                if path.name not in known and path.stat().st_mtime < cutoff:
+                    path.unlink(missing_ok=True)
+                    orphans += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired uploads and {orphans} orphaned part files."))
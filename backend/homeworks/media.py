@@ -0,0 +1,121 @@
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import content_disposition_header
+
+from .streaming import streaming_response
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+def file_etag(fieldfile):
+    """
+    A strong ETag from the stored name, size and modification time. Raises
+    Http404 when the row points at a file missing from storage.
+    """
+    storage = fieldfile.storage
+    try:
+        parts = [fieldfile.name, str(fieldfile.size)]
+    except OSError:
+        raise Http404("File not found")
+    try:
+        parts.append(storage.get_modified_time(fieldfile.name).isoformat())
+    except NotImplementedError:
+        pass
+    return '"%s"' % hashlib.md5("|".join(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def parse_range(header, size):
+    """
+    Returns (start, end) for a single `bytes=` range, None to serve the
+    whole file (no header, or a multi-range request we choose to ignore),
+    or False when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def _read_range(fieldfile, start, end):
+    with fieldfile.open('rb') as source:
+        source.seek(start)
+        remaining = end - start + 1
+        while remaining:
+            block = source.read(min(STREAM_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def serve_file(request, fieldfile):
+    """
+    Streams a stored FileField value with ETag revalidation and single
+    byte-range support. With HOMEWORK_MEDIA_SENDFILE set to
+    'x-accel-redirect' or 'x-sendfile', the body is left to the front web
+    server; Django only authorizes and answers conditional requests.
+    """
+    etag = file_etag(fieldfile)
+    filename = os.path.basename(fieldfile.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    mode = settings.HOMEWORK_MEDIA_SENDFILE
+    if mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        # nginx decodes the URI, so names with spaces, '?' or '#' must be quoted.
+        response['X-Accel-Redirect'] = quote(settings.HOMEWORK_MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + fieldfile.name)
+    elif mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = fieldfile.path
+    else:
+        size = fieldfile.size
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if not if_range or if_range == etag:
+            byte_range = parse_range(request.headers.get('Range'), size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            response = streaming_response(request, _read_range(fieldfile, start, end), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        else:
+            start, end = 0, size - 1
+            response = streaming_response(request, _read_range(fieldfile, start, end), content_type=content_type)
+        response['Content-Length'] = str(end - start + 1)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    response['Content-Disposition'] = content_disposition_header(False, filename)
+    return response
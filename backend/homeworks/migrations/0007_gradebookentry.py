@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_gradebook(apps, schema_editor):
+    HomeworkSubmission = apps.get_model('homeworks', 'HomeworkSubmission')
+    GradebookEntry = apps.get_model('homeworks', 'GradebookEntry')
+    submissions = HomeworkSubmission.objects.values(
+        'id', 'student_id', 'homework_id', 'homework__classroom_id', 'status', 'score',
+    )
+    GradebookEntry.objects.bulk_create(
+        (
+            GradebookEntry(
+                classroom_id=row['homework__classroom_id'],
+                student_id=row['student_id'],
+                homework_id=row['homework_id'],
+                submission_id=row['id'],
+                status=row['status'],
+                score=row['score'],
+            )
+            for row in submissions.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classroom', '0002_alter_classroom_tutor'),
+        ('homeworks', '0006_homeworksubmission_pending_upload_and_more'),
+        ('students', '0003_student_phone_student_telegram_username'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradebookEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.TextField(choices=[('on_time', 'On Time'), ('late_submission', 'Late Submission')])),
+                ('score', models.IntegerField(blank=True, null=True)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='classroom.classroom')),
+                ('homework', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='homeworks.homeworkclassroomassign')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='students.student')),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='gradebook_entry', to='homeworks.homeworksubmission')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['classroom', 'student', 'homework'], name='hw_gradebook_classroom_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_gradebook, migrations.RunPython.noop),
+    ]
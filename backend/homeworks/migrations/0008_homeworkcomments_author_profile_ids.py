@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:21
+
+from django.db import migrations, models
+
+
+def user_ids_to_profile_ids(apps, schema_editor):
+    # Comments used to be saved with the author's user id in user_object_id
+    # instead of the Tutor/Student id the generic relation points at.
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    HomeworkComments = apps.get_model('homeworks', 'HomeworkComments')
+    for app_label, model_name in (('tutors', 'tutor'), ('students', 'student')):
+        content_type = ContentType.objects.filter(app_label=app_label, model=model_name).first()
+        if content_type is None:
+            continue
+        profile_ids = dict(apps.get_model(app_label, model_name).objects.values_list('user_id', 'id'))
+        comments = list(HomeworkComments.objects.filter(user_content_type=content_type))
+        for comment in comments:
+            comment.user_object_id = profile_ids.get(comment.user_object_id, comment.user_object_id)
+        HomeworkComments.objects.bulk_update(comments, ['user_object_id'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('homeworks', '0007_gradebookentry'),
+        ('students', '0003_student_phone_student_telegram_username'),
+        ('tutors', '0002_tutor_phone_tutor_telegram_username'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='homeworkcomments',
+            index=models.Index(fields=['homework', 'id'], name='hw_comment_homework_id_idx'),
+        ),
+        migrations.RunPython(user_ids_to_profile_ids, migrations.RunPython.noop),
+    ]
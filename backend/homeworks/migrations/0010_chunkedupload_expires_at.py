@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:57
+
+import homeworks.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homeworks', '0009_homeworknotification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chunkedupload',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=homeworks.models.upload_expiry),
+        ),
+    ]
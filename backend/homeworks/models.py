@@ -1,6 +1,12 @@
 from django.db import models
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+from pathlib import Path
+import uuid
 # Create your models here.
 class HomeworkClassroomAssign(models.Model):
 
@@ -26,9 +32,12 @@ class HomeworkSubmission(models.Model):
 
     student = models.ForeignKey("students.Student", on_delete=models.CASCADE)
     homework = models.ForeignKey(HomeworkClassroomAssign, on_delete=models.CASCADE)
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(default=timezone.now)
     status = models.TextField(choices=STATUS_CHOICES)
     file = models.FileField(upload_to='submissions/', null=True, blank=True)
+    # Chunked upload still waiting to be moved into `file` by the
+    # finalization queue (see homeworks.admission).
+    pending_upload = models.ForeignKey('ChunkedUpload', null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
     score = models.IntegerField(null=True, blank=True)
     feedback = models.TextField(blank=True)
 
@@ -38,6 +47,22 @@ class HomeworkSubmission(models.Model):
     class Meta:
         constraints = [models.UniqueConstraint(fields=['student', 'homework'], name='unique_student_homework')]
 
+class GradebookEntry(models.Model):
+    """
+    Denormalized copy of a submission's status and score, keyed by
+    classroom so a whole gradebook is read with one index scan. Kept in
+    step with HomeworkSubmission by homeworks.gradebook.
+    """
+    classroom = models.ForeignKey("classroom.Classroom", on_delete=models.CASCADE)
+    student = models.ForeignKey("students.Student", on_delete=models.CASCADE)
+    homework = models.ForeignKey(HomeworkClassroomAssign, on_delete=models.CASCADE)
+    submission = models.OneToOneField(HomeworkSubmission, on_delete=models.CASCADE, related_name='gradebook_entry')
+    status = models.TextField(choices=HomeworkSubmission.STATUS_CHOICES)
+    score = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['classroom', 'student', 'homework'], name='hw_gradebook_classroom_idx')]
+
 class HomeworkComments(models.Model):
     homework = models.ForeignKey(HomeworkClassroomAssign, on_delete=models.CASCADE)
     timestamp = models.DateTimeField(auto_now_add=True)
@@ -45,4 +70,61 @@ class HomeworkComments(models.Model):
     user_content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     user_object_id = models.PositiveIntegerField()
     user = GenericForeignKey('user_content_type', 'user_object_id')
-    
\ No newline at end of file
+
+    class Meta:
+        indexes = [models.Index(fields=['homework', 'id'], name='hw_comment_homework_id_idx')]
+
+
+class HomeworkNotification(models.Model):
+    """
+    One event for one recipient, pushed live over the notification socket
+    and replayed by id to clients that reconnect (see homeworks.notifications).
+    """
+    KIND_CHOICES = [
+        ('comment', 'Comment'),
+        ('homework_assigned', 'Homework assigned'),
+        ('graded', 'Graded'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='homework_notifications')
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['recipient', 'id'], name='hw_notification_recipient_idx')]
+
+
+def upload_expiry():
+    return timezone.now() + timedelta(hours=settings.HOMEWORK_UPLOAD_EXPIRY_HOURS)
+
+
+class ChunkedUpload(models.Model):
+    """
+    A resumable upload assembled from chunks in HOMEWORK_UPLOAD_TEMP_DIR.
+    Once complete (and its checksum verified) it can be attached to a
+    submission or a homework attachment by id. Every chunk pushes
+    `expires_at` back; `manage.py prune_uploads` deletes abandoned ones.
+    """
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    offset = models.BigIntegerField(default=0)
+    status = models.TextField(choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(default=upload_expiry, db_index=True)
+
+    @property
+    def temp_path(self):
+        return Path(settings.HOMEWORK_UPLOAD_TEMP_DIR) / f"{self.id}.part"
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
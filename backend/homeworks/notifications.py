@@ -0,0 +1,110 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .models import HomeworkNotification, HomeworkSubmission
+
+logger = logging.getLogger(__name__)
+
+
+def notification_group(user_id):
+    return f"notifications_{user_id}"
+
+
+def serialize_event(notification):
+    return {
+        'id': notification.id,
+        'kind': notification.kind,
+        'payload': notification.payload,
+        'created_at': notification.created_at.isoformat(),
+    }
+
+
+def _push(notifications):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    for notification in notifications:
+        try:
+            async_to_sync(channel_layer.group_send)(
+                notification_group(notification.recipient_id),
+                {'type': 'notification_event', 'event': serialize_event(notification)},
+            )
+        except Exception:
+            # The event is stored; the client gets it on its next replay.
+            logger.exception("Failed to push notification %s", notification.id)
+
+
+def _store(notifications):
+    """
+    Saves the events and pushes them to the recipients' open notification
+    sockets once the current transaction commits.
+    """
+    notifications = HomeworkNotification.objects.bulk_create(notifications)
+    if notifications:
+        transaction.on_commit(lambda: _push(notifications))
+    return notifications
+
+
+def notify(recipient_ids, kind, payload):
+    return _store([
+        HomeworkNotification(recipient_id=recipient_id, kind=kind, payload=payload)
+        for recipient_id in sorted(set(recipient_ids))
+    ])
+
+
+def _classroom_student_user_ids(classroom_id):
+    from classroom.models import Classroom
+
+    return Classroom.students.through.objects.filter(classroom_id=classroom_id).values_list('student__user_id', flat=True)
+
+
+def notify_homework_assigned(homework):
+    notify(_classroom_student_user_ids(homework.classroom_id), 'homework_assigned', {
+        'homework_id': homework.id,
+        'classroom_id': homework.classroom_id,
+        'title': homework.title,
+        'due_date': homework.due_date.isoformat(),
+    })
+
+
+def notify_comment(comment):
+    """Everyone in the homework's classroom except the author."""
+    homework = comment.homework
+    author = comment.user
+    recipients = set(_classroom_student_user_ids(homework.classroom_id))
+    recipients.add(homework.classroom.tutor.user_id)
+    if author is not None:
+        recipients.discard(author.user_id)
+    notify(recipients, 'comment', {
+        'comment_id': comment.id,
+        'homework_id': homework.id,
+        'classroom_id': homework.classroom_id,
+        'text': comment.text,
+        'username': author.user.username if author else None,
+        'user_type': author.__class__.__name__ if author else None,
+        'timestamp': comment.timestamp.isoformat(),
+    })
+
+
+def notify_graded(submission_ids):
+    """
+    One event per graded submission to its student. Called by the grading
+    views, since a submission is saved for other reasons too.
+    """
+    submissions = HomeworkSubmission.objects.filter(id__in=submission_ids).values(
+        'id', 'homework_id', 'homework__classroom_id', 'homework__title', 'student__user_id', 'score', 'feedback',
+    )
+    return _store([
+        HomeworkNotification(recipient_id=row['student__user_id'], kind='graded', payload={
+            'submission_id': row['id'],
+            'homework_id': row['homework_id'],
+            'classroom_id': row['homework__classroom_id'],
+            'title': row['homework__title'],
+            'score': row['score'],
+            'feedback': row['feedback'],
+        })
+        for row in submissions
+    ])
@@ -0,0 +1,103 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class HomeworkPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CommentKeysetPagination(BasePagination):
+    """
+    Keyset pagination over comment ids, which grow with `timestamp`.
+
+    Without parameters the latest page is returned. `before=<id>` walks back
+    to older comments; `since=<id>` returns comments posted after that one,
+    so polling clients pass the id of the last comment they have. Each page
+    is in chronological order.
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    before_query_param = 'before'
+    since_query_param = 'since'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self._int_param(request, self.page_size_query_param, self.page_size)
+        page_size = min(page_size, self.max_page_size)
+        before = self._int_param(request, self.before_query_param)
+        since = self._int_param(request, self.since_query_param)
+
+        if before and since:
+            raise ValidationError("Pass either 'before' or 'since', not both.")
+
+        if since:
+            rows = list(queryset.filter(id__gt=since).order_by('id')[:page_size + 1])
+            self.has_newer = len(rows) > page_size
+            self.has_older = True
+            page = rows[:page_size]
+        else:
+            if before:
+                queryset = queryset.filter(id__lt=before)
+            rows = list(queryset.order_by('-id')[:page_size + 1])
+            self.has_older = len(rows) > page_size
+            self.has_newer = bool(before)
+            page = rows[:page_size][::-1]
+
+        self.page = page
+        # Polling clients resume from here; with an empty page they keep the
+        # cursor they sent.
+        self.latest_id = page[-1].id if page else since
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'latest_id': self.latest_id,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'latest_id': {'type': 'integer', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.page or not self.has_newer:
+            return None
+        return self._link(self.since_query_param, self.before_query_param, self.page[-1].id)
+
+    def get_previous_link(self):
+        if not self.page or not self.has_older:
+            return None
+        return self._link(self.before_query_param, self.since_query_param, self.page[0].id)
+
+    def _link(self, param, other_param, value):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, other_param)
+        return replace_query_param(url, param, value)
+
+    @staticmethod
+    def _int_param(request, name, default=None):
+        raw = request.query_params.get(name)
+        if raw is None:
+            return default
+        try:
+            value = int(raw)
+        except ValueError:
+            raise ValidationError({name: "Must be an integer."})
+        if value < 1:
+            raise ValidationError({name: "Must be a positive integer."})
+        return value
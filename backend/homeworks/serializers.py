@@ -1,50 +1,93 @@
 from rest_framework import serializers
-from .models import HomeworkClassroomAssign, HomeworkSubmission, HomeworkComments
+from .models import HomeworkClassroomAssign, HomeworkSubmission, HomeworkComments, ChunkedUpload
+from .uploads import get_completed_upload, attach_upload
+from .admission import mark_submitted, queue_finalization
 from django.core.validators import MaxValueValidator, MinValueValidator 
 from django.utils import timezone
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from rest_framework.exceptions import ValidationError
 from django.contrib.auth.models import User
+from django.conf import settings
 from tutors.models import Tutor
 class HomeworkCreateSerializer(serializers.ModelSerializer):
+    # Id of a completed chunked upload to use instead of a multipart `attachment`.
+    attachment_upload_id = serializers.UUIDField(write_only=True, required=False)
+
     class Meta:
         model = HomeworkClassroomAssign
-        fields = ['title', 'description', 'due_date', 'attachment', 'is_optional']
+        fields = ['title', 'description', 'due_date', 'attachment', 'is_optional', 'attachment_upload_id']
         read_only_fields = ['assigned_by']
 
+    def validate(self, attrs):
+        if attrs.get('attachment') and attrs.get('attachment_upload_id'):
+            raise serializers.ValidationError("Send either attachment or attachment_upload_id, not both.")
+        if attrs.get('attachment_upload_id'):
+            attrs['attachment_upload'] = get_completed_upload(self.context['request'].user, attrs.pop('attachment_upload_id'))
+        return attrs
+
     def create(self, validated_data):
         tutor = self.context['tutor'] 
         classroom = self.context['classroom']
-        return HomeworkClassroomAssign.objects.create(
-            assigned_by=tutor,
-            classroom=classroom,
-            **validated_data
-        )
+        upload = validated_data.pop('attachment_upload', None)
+        with transaction.atomic():
+            homework = HomeworkClassroomAssign.objects.create(
+                assigned_by=tutor,
+                classroom=classroom,
+                **validated_data
+            )
+            if upload:
+                attach_upload(homework, 'attachment', upload)
+        return homework
     
 class HomeworkSubmitSerializer(serializers.ModelSerializer):
+    # Id of a completed chunked upload to use instead of a multipart `file`.
+    upload_id = serializers.UUIDField(write_only=True, required=False)
+
+    file_pending = serializers.SerializerMethodField()
+
     class Meta:
-        fields = ['file']
-        read_only_fields = ['score', 'feedback']
+        fields = ['file', 'upload_id', 'status', 'submitted_at', 'file_pending']
+        read_only_fields = ['score', 'feedback', 'status', 'submitted_at']
         model = HomeworkSubmission
+
+    def get_file_pending(self, obj):
+        return obj.pending_upload_id is not None
+
+    def validate(self, attrs):
+        if attrs.get('file') and attrs.get('upload_id'):
+            raise serializers.ValidationError("Send either file or upload_id, not both.")
+        if attrs.get('upload_id'):
+            attrs['upload'] = get_completed_upload(self.context['request'].user, attrs.pop('upload_id'))
+        return attrs
     
     def create(self, validated_data):
 
         student = self.context['student']
         homework = self.context['homework']
-        now = timezone.now()
+        upload = validated_data.pop('upload', None)
+        # On time or late is decided by when the request arrived, not by
+        # when a busy worker got round to processing it.
+        received_at = self.context.get('received_at') or timezone.now()
         try:
-            if now <= homework.due_date:
+            if received_at <= homework.due_date:
                 status = 'on_time'
             else:
                 status = 'late_submission'
             
-            return HomeworkSubmission.objects.create(
-                student=student,
-                homework=homework,
-                status=status,
-                **validated_data
-            )
+            with transaction.atomic():
+                submission = HomeworkSubmission.objects.create(
+                    student=student,
+                    homework=homework,
+                    status=status,
+                    submitted_at=received_at,
+                    pending_upload=upload,
+                    **validated_data
+                )
+                if upload:
+                    queue_finalization(submission.id)
+            return submission
         except IntegrityError:
+            mark_submitted(homework.id, self.context['request'].user.id)
             raise ValidationError("You have already submitted this homework")
     
 class HomeworkGradeSerializer(serializers.Serializer):
@@ -57,10 +100,36 @@ class HomeworkGradeSerializer(serializers.Serializer):
             raise serializers.ValidationError("Grade must be a whole number")
         return attrs
     
+class HomeworkBulkGradeItemSerializer(HomeworkGradeSerializer):
+    submission_id = serializers.IntegerField()
+
+class HomeworkBulkGradeSerializer(serializers.Serializer):
+    # Rows are validated one by one in the view so each gets its own result.
+    grades = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=2000)
+    
 class HomeworksViewSerializer(serializers.ModelSerializer):
     class  Meta:
         model = HomeworkClassroomAssign
         fields = ['id', 'title', 'description', 'due_date', 'attachment', 'is_optional']
+
+class TutorHomeworkListSerializer(HomeworksViewSerializer):
+    submission_count = serializers.IntegerField(read_only=True)
+    graded_count = serializers.IntegerField(read_only=True)
+
+    class Meta(HomeworksViewSerializer.Meta):
+        fields = HomeworksViewSerializer.Meta.fields + ['submission_count', 'graded_count']
+
+class StudentHomeworkListSerializer(HomeworksViewSerializer):
+    submitted = serializers.BooleanField(read_only=True)
+
+    class Meta(HomeworksViewSerializer.Meta):
+        fields = HomeworksViewSerializer.Meta.fields + ['submitted']
+
+class HomeworkListFilterSerializer(serializers.Serializer):
+    due_after = serializers.DateTimeField(required=False)
+    due_before = serializers.DateTimeField(required=False)
+    is_optional = serializers.BooleanField(required=False, allow_null=True, default=None)
+    submitted = serializers.BooleanField(required=False, allow_null=True, default=None)
     
 class HomeworkViewSubmissionsSerializer(serializers.ModelSerializer):
     class Meta:
@@ -80,10 +149,32 @@ class HomeworkAllCommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = HomeworkComments
         read_only_fields = ['user', 'user_content_type', 'user_object_id']
-        fields = ['username', 'user_type', 'text', 'timestamp']
+        fields = ['id', 'username', 'user_type', 'text', 'timestamp']
 
     def get_user_type(self, obj):
-        return obj.user.__class__.__name__
-        
+        return obj.user.__class__.__name__ if obj.user else None
+
     def get_username(self, obj):
-        return obj.user.user.username
\ No newline at end of file
+        return obj.user.user.username if obj.user else None
+
+class ChunkedUploadSerializer(serializers.ModelSerializer):
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', write_only=True)
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ChunkedUpload
+        fields = ['id', 'filename', 'size', 'sha256', 'offset', 'status', 'chunk_size', 'expires_at']
+        read_only_fields = ['offset', 'status', 'expires_at']
+
+    def get_chunk_size(self, obj):
+        return settings.HOMEWORK_UPLOAD_CHUNK_SIZE
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Size must be positive.")
+        if value > settings.HOMEWORK_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Uploads may be at most {settings.HOMEWORK_UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+    def validate_sha256(self, value):
+        return value.lower()
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .gradebook import sync_submissions
+from .models import HomeworkClassroomAssign, HomeworkComments, HomeworkSubmission
+from .notifications import notify_comment, notify_homework_assigned
+
+
+@receiver(post_save, sender=HomeworkSubmission)
+def submission_saved(sender, instance, raw=False, **kwargs):
+    # Deleted submissions take their entry with them (on_delete=CASCADE).
+    if not raw:
+        sync_submissions([instance.id])
+
+
+@receiver(post_save, sender=HomeworkClassroomAssign)
+def homework_saved(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        notify_homework_assigned(instance)
+
+
+@receiver(post_save, sender=HomeworkComments)
+def comment_saved(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        notify_comment(instance)
@@ -0,0 +1,33 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+_EXHAUSTED = object()
+
+
+async def _iterate_in_sync_thread(iterable):
+    # thread_sensitive keeps every step on the same thread, so a server-side
+    # cursor or open file behind the iterator stays usable between chunks.
+    iterator = iter(iterable)
+    step = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await step(iterator, _EXHAUSTED)
+            if chunk is _EXHAUSTED:
+                return
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
+
+
+def streaming_response(request, content, **kwargs):
+    """
+    StreamingHttpResponse that stays streaming under ASGI too. Django's ASGI
+    handler would otherwise read a synchronous iterator into memory with
+    list() before sending anything.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        content = _iterate_in_sync_thread(content)
+    return StreamingHttpResponse(content, **kwargs)
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import ChunkedUpload, upload_expiry
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+COPY_BLOCK_SIZE = 64 * 1024
+
+
+class UploadedPartFile(File):
+    """
+    Exposes the finished part file the way Django's TemporaryUploadedFile
+    does, so FileSystemStorage moves it into place instead of copying it.
+    """
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def parse_content_range(header):
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise ValidationError("Content-Range header must look like 'bytes <start>-<end>/<total>'.")
+    start, end, total = (int(value) for value in match.groups())
+    if end < start:
+        raise ValidationError("Invalid Content-Range.")
+    return start, end, total
+
+
+def write_chunk(upload_id, user, stream, start, end, total, max_chunk_size):
+    """
+    Appends bytes start..end (inclusive) read from `stream` to the upload,
+    in small blocks so memory use does not depend on the chunk size. Chunks
+    must arrive in order; a retried chunk at the current offset overwrites
+    whatever a failed attempt left behind.
+    """
+    length = end - start + 1
+    if length > max_chunk_size:
+        raise ValidationError(f"Chunks may be at most {max_chunk_size} bytes.")
+
+    checksum_failed = False
+    with transaction.atomic():
+        upload = ChunkedUpload.objects.select_for_update().filter(id=upload_id, user=user).first()
+        if upload is None:
+            return None
+        if upload.status != 'uploading':
+            raise ValidationError("Upload is already complete.")
+        if total != upload.size:
+            raise ValidationError("Content-Range total does not match the upload size.")
+        if start != upload.offset:
+            raise ValidationError({'detail': "Unexpected chunk offset.", 'offset': upload.offset})
+        if end >= upload.size:
+            raise ValidationError("Chunk runs past the end of the upload.")
+
+        path = upload.temp_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'r+b' if path.exists() else 'wb') as target:
+            target.seek(start)
+            remaining = length
+            while remaining:
+                block = stream.read(min(COPY_BLOCK_SIZE, remaining))
+                if not block:
+                    raise ValidationError("Request body is shorter than the Content-Range.")
+                target.write(block)
+                remaining -= len(block)
+            target.truncate()
+
+        upload.offset = end + 1
+        upload.expires_at = upload_expiry()
+        if upload.offset == upload.size:
+            if file_sha256(path) == upload.sha256:
+                upload.status = 'complete'
+            else:
+                path.unlink(missing_ok=True)
+                upload.offset = 0
+                checksum_failed = True
+        upload.save(update_fields=['offset', 'status', 'expires_at'])
+
+    if checksum_failed:
+        raise ValidationError("Checksum mismatch, the upload has been reset.")
+    return upload
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(COPY_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_completed_upload(user, upload_id):
+    upload = ChunkedUpload.objects.filter(id=upload_id, user=user, status='complete').first()
+    if upload is None:
+        raise ValidationError({'upload_id': "No completed upload with this id."})
+    return upload
+
+
+def attach_upload(instance, field_name, upload):
+    """
+    Saves the finished upload into `instance.<field_name>` through the
+    field's storage, then drops the upload record.
+    """
+    with open(upload.temp_path, 'rb') as source:
+        getattr(instance, field_name).save(upload.filename, UploadedPartFile(source), save=True)
+    if os.path.exists(upload.temp_path):
+        os.remove(upload.temp_path)
+    upload.delete()
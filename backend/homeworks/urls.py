@@ -1,16 +1,30 @@
 from django.urls import path
-from .views import HomeworkCreateView, HomeworkSubmitView, HomeworkGrade, HomeworksView, HomeworkViewSubmissions, HomeworkViewSubmission, HomeworkDetailView, HomeworkCommentCreateView
+from .views import HomeworkCreateView, HomeworkSubmitView, HomeworkGrade, HomeworksView, HomeworkViewSubmissions, HomeworkViewSubmission, HomeworkDetailView, HomeworkCommentCreateView, HomeworkBulkGrade, ChunkedUploadCreateView, ChunkedUploadView, HomeworkAttachmentDownloadView, HomeworkSubmissionDownloadView, ClassroomGradebookView, SubmissionExportView
 
 urlpatterns = [
     path("classroom/<int:classroom_id>/assign/", HomeworkCreateView.as_view()),
     path('<int:homework_id>/submit/', HomeworkSubmitView.as_view(), name='Submit homework'),
     path('<int:homework_id>/grade/', HomeworkGrade.as_view(), name='Grade homework'),
+    path('<int:homework_id>/grade/bulk/', HomeworkBulkGrade.as_view(), name='Bulk grade homework'),
+
+    # RESUMABLE CHUNKED UPLOADS FOR SUBMISSIONS AND ATTACHMENTS
+    path('uploads/', ChunkedUploadCreateView.as_view(), name='Start chunked upload'),
+    path('uploads/<uuid:upload_id>/', ChunkedUploadView.as_view(), name='Chunked upload'),
+
+    # AUTHORIZED DOWNLOADS OF ATTACHMENTS AND SUBMITTED FILES
+    path('<int:homework_id>/attachment/', HomeworkAttachmentDownloadView.as_view(), name='Download homework attachment'),
+    path('submissions/<int:submission_id>/file/', HomeworkSubmissionDownloadView.as_view(), name='Download submission file'),
 
 
 
     path('classroom/<int:classroom_id>/homework/<int:homework_id>', HomeworkDetailView.as_view(), name="view homework details"),
 
     path('classroom/<int:classroom_id>/', HomeworksView.as_view(), name='View all homeworks in classroom'),
+    path('classroom/<int:classroom_id>/gradebook/', ClassroomGradebookView.as_view(), name='Classroom gradebook'),
+
+    # STREAMING CSV/XLSX EXPORT OF SUBMISSIONS
+    path('classroom/<int:classroom_id>/export/', SubmissionExportView.as_view(), name='Export classroom submissions'),
+    path('export/', SubmissionExportView.as_view(), name='Export all submissions of tutor'),
     path('classroom/<int:classroom_id>/homework/<int:assigned_homework_id>/submissions/', HomeworkViewSubmissions.as_view(), name="View all homework submission"),
 
 
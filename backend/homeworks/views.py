@@ -1,16 +1,31 @@
+import io
 from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework import permissions, status
 from tutors.models import Tutor
 from students.models import Student
 from rest_framework.exceptions import NotFound
-from rest_framework.generics import CreateAPIView
+from rest_framework.generics import CreateAPIView, ListAPIView
 from rest_framework import exceptions
-from .models import HomeworkSubmission, HomeworkClassroomAssign, HomeworkComments
-from .serializers import HomeworkGradeSerializer, HomeworkSubmitSerializer, HomeworksViewSerializer, HomeworkCreateSerializer, HomeworkViewSubmissionsSerializer, HomeworkCommentSerializer, HomeworkAllCommentSerializer
+from .models import HomeworkSubmission, HomeworkClassroomAssign, HomeworkComments, ChunkedUpload
+from .uploads import parse_content_range, write_chunk
+from .media import serve_file
+from .admission import SubmissionSlot, is_marked_submitted, mark_submitted
+from .gradebook import build_gradebook, sync_submissions
+from .notifications import notify_graded
+from .exports import csv_chunks, submission_export_rows, tutor_submissions, xlsx_chunks
+from .streaming import streaming_response
+from .serializers import HomeworkGradeSerializer, HomeworkSubmitSerializer, HomeworksViewSerializer, HomeworkCreateSerializer, HomeworkViewSubmissionsSerializer, HomeworkCommentSerializer, HomeworkAllCommentSerializer, TutorHomeworkListSerializer, StudentHomeworkListSerializer, HomeworkListFilterSerializer, HomeworkBulkGradeSerializer, HomeworkBulkGradeItemSerializer, ChunkedUploadSerializer
+from .pagination import HomeworkPagination, CommentKeysetPagination
 from rest_framework.response import Response
 from classroom.models import Classroom
+from core.graphql_api.cache import invalidate_submissions
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.contenttypes.prefetch import GenericPrefetch
+from django.conf import settings
+from django.utils import timezone
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, prefetch_related_objects
 # from django.contrib.auth.models import User
 # Create your views here.
 
@@ -21,9 +36,8 @@ class HomeworkCreateView(CreateAPIView):
     
     def get_serializer_context(self, *args, **kwargs):
         context = super().get_serializer_context()
-        try:
-            tutor = Tutor.objects.get(user=self.request.user)
-        except Tutor.DoesNotExist:
+        tutor = self.request.profile
+        if not isinstance(tutor, Tutor):
             raise NotFound("not found tutor")
         classroom_id = self.kwargs.get('classroom_id')
         try:
@@ -36,14 +50,38 @@ class HomeworkCreateView(CreateAPIView):
         return context
 
 class HomeworkSubmitView(CreateAPIView):
+    """
+    Submits a homework. Repeat submissions are turned away from the cache,
+    and at most HOMEWORK_SUBMIT_CONCURRENCY submissions per homework are
+    processed at once; extra ones get 429 with Retry-After.
+    """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = HomeworkSubmitSerializer
 
+    def initial(self, request, *args, **kwargs):
+        self.received_at = timezone.now()
+        super().initial(request, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        homework_id = self.kwargs.get('homework_id')
+        if is_marked_submitted(homework_id, request.user.id):
+            raise exceptions.ValidationError("You have already submitted this homework")
+
+        slot = SubmissionSlot(homework_id)
+        if not slot.acquire():
+            raise exceptions.Throttled(wait=settings.HOMEWORK_SUBMIT_RETRY_AFTER)
+        try:
+            response = super().create(request, *args, **kwargs)
+        finally:
+            slot.release()
+        mark_submitted(homework_id, request.user.id)
+        return response
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
-        try:
-            student = Student.objects.get(user=self.request.user)
-        except Student.DoesNotExist:
+        context['received_at'] = getattr(self, 'received_at', None)
+        student = self.request.profile
+        if not isinstance(student, Student):
             raise NotFound("not found student")
         homework_id = self.kwargs.get('homework_id')
         try:
@@ -52,7 +90,6 @@ class HomeworkSubmitView(CreateAPIView):
             raise NotFound("not found homework")
         
         if homework:
-            print("homework is here", homework)
             context["homework"] = homework
         context['student'] = student
         return context
@@ -62,9 +99,8 @@ class HomeworkGrade(APIView):
 
 
     def post(self, request, *args, **kwargs):
-        try:
-            tutor = Tutor.objects.get(user=self.request.user)
-        except Tutor.DoesNotExist:
+        tutor = self.request.profile
+        if not isinstance(tutor, Tutor):
             raise NotFound("not found tutor")
         
         homework_id = self.kwargs['homework_id']
@@ -79,54 +115,273 @@ class HomeworkGrade(APIView):
         submission.feedback = serializer.validated_data['feedback']
         submission.score = serializer.validated_data['score']
         submission.save()
+        notify_graded([submission.id])
 
         return Response({"message": "Grade submitted successfully"}, status=status.HTTP_200_OK)
 
 
-class HomeworksView(APIView):
+class ChunkedUploadCreateView(CreateAPIView):
+    """
+    Starts a resumable upload. Send `filename`, total `size` and the file's
+    `sha256`; then PUT the chunks to the returned upload.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = ChunkedUploadSerializer
 
-    def get(self, request, *args, **kwargs):
-        user = self.request.user
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class ChunkedUploadView(APIView):
+    """
+    GET reports how far an upload got, so clients can resume from `offset`.
+    PUT appends one chunk: the raw bytes as the body plus a
+    `Content-Range: bytes <start>-<end>/<size>` header.
+    DELETE abandons the upload.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, upload_id):
+        upload = ChunkedUpload.objects.filter(id=upload_id, user=request.user).first()
+        if upload is None:
+            raise NotFound("not found upload")
+        return Response(ChunkedUploadSerializer(upload).data)
+
+    def put(self, request, upload_id):
+        start, end, total = parse_content_range(request.headers.get('Content-Range'))
+        # DRF leaves the stream unset when the body is empty.
+        stream = request.stream if request.stream is not None else io.BytesIO()
+        upload = write_chunk(
+            upload_id, request.user, stream, start, end, total,
+            max_chunk_size=settings.HOMEWORK_UPLOAD_CHUNK_SIZE,
+        )
+        if upload is None:
+            raise NotFound("not found upload")
+        return Response(ChunkedUploadSerializer(upload).data)
+
+    def delete(self, request, upload_id):
+        upload = ChunkedUpload.objects.filter(id=upload_id, user=request.user).first()
+        if upload is None:
+            raise NotFound("not found upload")
+        upload.temp_path.unlink(missing_ok=True)
+        upload.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class HomeworkAttachmentDownloadView(APIView):
+    """
+    Serves a homework's attachment to the classroom's tutor and students.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, homework_id):
+        user = request.user
+        homework = HomeworkClassroomAssign.objects.filter(id=homework_id).filter(
+            Q(classroom__tutor__user=user)
+            | Q(classroom__in=Classroom.objects.filter(students__user=user))
+        ).only('id', 'attachment').first()
+        if homework is None or not homework.attachment:
+            raise NotFound("not found attachment")
+        return serve_file(request, homework.attachment)
+
+
+class HomeworkSubmissionDownloadView(APIView):
+    """
+    Serves a submitted file to the student who submitted it and to the
+    classroom's tutor.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, submission_id):
+        user = request.user
+        submission = HomeworkSubmission.objects.filter(id=submission_id).filter(
+            Q(student__user=user) | Q(homework__classroom__tutor__user=user)
+        ).only('id', 'file').first()
+        if submission is None or not submission.file:
+            raise NotFound("not found submission file")
+        return serve_file(request, submission.file)
+
+
+class ClassroomGradebookView(APIView):
+    """
+    Students x homeworks grade matrix of a classroom with per-student and
+    per-homework averages, missing and late counts. Tutor only.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, classroom_id):
+        try:
+            classroom = Classroom.objects.get(id=classroom_id, tutor__user=request.user)
+        except Classroom.DoesNotExist:
+            raise NotFound("not found classroom of this tutor")
+        return Response(build_gradebook(classroom))
+
+
+class SubmissionExportView(APIView):
+    """
+    Streams every submission of a tutor's classroom (or of all their
+    classrooms without classroom_id) with score, feedback and status.
+    ?file_format=csv (default) streams rows as they are read; xlsx is built
+    in full on disk first, see xlsx_chunks.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    content_types = {
+        'csv': 'text/csv; charset=utf-8',
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    }
+
+    def get(self, request, classroom_id=None):
+        if not isinstance(request.profile, Tutor):
+            raise exceptions.PermissionDenied("only tutors can export submissions")
+        if classroom_id is not None and not Classroom.objects.filter(id=classroom_id, tutor__user=request.user).exists():
+            raise NotFound("not found classroom of this tutor")
+
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in self.content_types:
+            raise exceptions.ValidationError({"file_format": "must be csv or xlsx"})
+
+        rows = submission_export_rows(tutor_submissions(request.user, classroom_id))
+        chunks = csv_chunks(rows) if file_format == 'csv' else xlsx_chunks(rows)
+        filename = f"submissions_{classroom_id or 'all'}_{timezone.localdate():%Y%m%d}.{file_format}"
+        response = streaming_response(request, chunks, content_type=self.content_types[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class HomeworkBulkGrade(APIView):
+    """
+    Grades many submissions of one homework at once. Every row gets a
+    result; valid rows are written together in one transaction.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        tutor = self.request.profile
+        if not isinstance(tutor, Tutor):
+            raise NotFound("not found tutor")
+
+        homework_id = self.kwargs['homework_id']
+        payload = HomeworkBulkGradeSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+
+        results = []
+        valid = {}
+        for index, row in enumerate(payload.validated_data['grades']):
+            item = HomeworkBulkGradeItemSerializer(data=row)
+            if not item.is_valid():
+                results.append({'index': index, 'submission_id': row.get('submission_id'), 'status': 'invalid', 'errors': item.errors})
+                continue
+            submission_id = item.validated_data['submission_id']
+            if submission_id in valid:
+                results.append({'index': index, 'submission_id': submission_id, 'status': 'invalid', 'errors': ['Duplicate submission_id']})
+                continue
+            valid[submission_id] = (index, item.validated_data)
+
+        with transaction.atomic():
+            submissions = HomeworkSubmission.objects.select_for_update().filter(
+                id__in=valid.keys(),
+                homework_id=homework_id,
+                homework__assigned_by=tutor,
+            ).only('id', 'score', 'feedback')
+            found = {submission.id: submission for submission in submissions}
+
+            for submission_id, (index, data) in valid.items():
+                submission = found.get(submission_id)
+                if submission is None:
+                    results.append({'index': index, 'submission_id': submission_id, 'status': 'not_found'})
+                    continue
+                submission.score = data['score']
+                submission.feedback = data['feedback']
+                results.append({'index': index, 'submission_id': submission_id, 'status': 'graded'})
+
+            HomeworkSubmission.objects.bulk_update(found.values(), ['score', 'feedback'], batch_size=500)
+            # bulk_update skips post_save, so refresh the gradebook here.
+            sync_submissions(found.keys())
+            invalidate_submissions(found.keys())
+            notify_graded(found.keys())
+
+        results.sort(key=lambda result: result['index'])
+        return Response({
+            'graded': len(found),
+            'failed': len(results) - len(found),
+            'results': results,
+        }, status=status.HTTP_200_OK)
+
+
+class HomeworksView(ListAPIView):
+    """
+    Paginated homeworks of one classroom. Filters: `due_after`,
+    `due_before`, `is_optional` and, for students, `submitted`.
+    Tutors also get submission and graded counts per homework.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = HomeworkPagination
+
+    def get_serializer_class(self):
+        if getattr(self, 'student', None):
+            return StudentHomeworkListSerializer
+        return TutorHomeworkListSerializer
+
+    def get_queryset(self):
+        profile = self.request.profile
         classroom_id = self.kwargs.get('classroom_id')
         try:
             classroom = Classroom.objects.get(id=classroom_id)
         except Classroom.DoesNotExist:
             raise NotFound("Classroom not found")
-        
-        try:
-            tutor = Tutor.objects.get(user=user)
-            try:
-                classroom.tutor = tutor
-            except Exception as e:
+
+        self.student = None
+        if isinstance(profile, Tutor):
+            if classroom.tutor_id != profile.id:
                 raise exceptions.PermissionDenied("Not tutor of this classroom")
-            homeworks = HomeworkClassroomAssign.objects.all()
-            serializer = HomeworksViewSerializer(homeworks, many=True)
-            return Response(serializer.data)
-        except Tutor.DoesNotExist:
-            student = Student.objects.get(user=user)
-            if not classroom.students.filter(pk=student.pk).exists():
+        else:
+            self.student = profile if isinstance(profile, Student) else None
+            if not self.student or not classroom.students.filter(pk=self.student.pk).exists():
                 raise exceptions.PermissionDenied("Not a student of this classroom")
-            homeworks = HomeworkClassroomAssign.objects.filter(classroom=classroom).all()
-            serializer = HomeworksViewSerializer(homeworks, many=True)
-            return Response(serializer.data)
+
+        filters = HomeworkListFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        params = filters.validated_data
+
+        homeworks = HomeworkClassroomAssign.objects.filter(classroom=classroom)
+        if params.get('due_after'):
+            homeworks = homeworks.filter(due_date__gte=params['due_after'])
+        if params.get('due_before'):
+            homeworks = homeworks.filter(due_date__lte=params['due_before'])
+        if params.get('is_optional') is not None:
+            homeworks = homeworks.filter(is_optional=params['is_optional'])
+
+        if self.student:
+            homeworks = homeworks.annotate(submitted=Exists(
+                HomeworkSubmission.objects.filter(homework=OuterRef('pk'), student=self.student)
+            ))
+            if params.get('submitted') is not None:
+                homeworks = homeworks.filter(submitted=params['submitted'])
+        else:
+            homeworks = homeworks.annotate(
+                submission_count=Count('homeworksubmission'),
+                graded_count=Count('homeworksubmission', filter=Q(homeworksubmission__score__isnull=False)),
+            )
+
+        return homeworks.order_by('-due_date', '-id')
         
 
 class HomeworkDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated]   
 
     def get(self, request, *args, **kwargs):
-        user = self.request.user
+        profile = request.profile
         homework_id = self.kwargs.get('homework_id')
         classrooom_id = self.kwargs.get('classroom_id')
 
-        if hasattr(user, 'tutor'):
+        if isinstance(profile, Tutor):
               classroom = Classroom.objects.get(id=classrooom_id)
-              if classroom.tutor.user == user:
+              if classroom.tutor_id == profile.id:
                   
                   homework = HomeworkClassroomAssign.objects.get(id=homework_id)
                   serializer = HomeworksViewSerializer(homework)
                   return Response(serializer.data)
-        if hasattr(user, 'student'):
+        if isinstance(profile, Student):
             pass
 
 class HomeworkViewSubmissions(APIView):
@@ -134,7 +389,6 @@ class HomeworkViewSubmissions(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        user = self.request.user
         classroom_id = self.kwargs.get('classroom_id')
         homework_id = self.kwargs.get('assigned_homework_id')
 
@@ -150,23 +404,16 @@ class HomeworkViewSubmissions(APIView):
             raise NotFound("Classroom not found")
         
         
-        try:
-            tutor = Tutor.objects.get(user=user)
-            try:
-                classroom.tutor = tutor
-            except Tutor.DoesNotExist:
-                raise exceptions.PermissionDenied("Not tutor of this classroom")
-            
-            homework_submissions = HomeworkSubmission.objects.filter(homework=homework)
-            serializer = HomeworkViewSubmissionsSerializer(homework_submissions, many=True)
-            return Response(serializer.data)
-        except Tutor.DoesNotExist:
+        if not isinstance(request.profile, Tutor) or classroom.tutor_id != request.profile.id:
             raise exceptions.PermissionDenied("Not tutor of this classroom")
 
+        homework_submissions = HomeworkSubmission.objects.filter(homework=homework)
+        serializer = HomeworkViewSubmissionsSerializer(homework_submissions, many=True)
+        return Response(serializer.data)
+
 
 class HomeworkViewSubmission(APIView):
     def get(self, request, *args, **kwargs):
-        user = self.request.user
         classroom_id = self.kwargs.get('classroom_id')
         homework_id = self.kwargs.get('assigned_homework_id')
         homework_submission_id = self.kwargs.get('submission_id')
@@ -182,60 +429,66 @@ class HomeworkViewSubmission(APIView):
         except HomeworkClassroomAssign.DoesNotExist:
             raise NotFound("Classroom not found")
 
-        try:
-            tutor = Tutor.objects.get(user=user)
-            try:
-                classroom.tutor = tutor
-            except Tutor.DoesNotExist:
-                raise exceptions.PermissionDenied("Not tutor of this classroom")
-            
-            try:
-                homework_submission = HomeworkSubmission.objects.get(id=homework_submission_id)
-            except HomeworkSubmission.DoesNotExist:
-                raise NotFound("Not found such submission")
-            serializer = HomeworkViewSubmissionsSerializer(homework_submission)
-            return Response(serializer.data)
-        except Tutor.DoesNotExist:
+        if not isinstance(request.profile, Tutor) or classroom.tutor_id != request.profile.id:
             raise exceptions.PermissionDenied("Not tutor of this classroom")
+
+        try:
+            homework_submission = HomeworkSubmission.objects.get(id=homework_submission_id)
+        except HomeworkSubmission.DoesNotExist:
+            raise NotFound("Not found such submission")
+        serializer = HomeworkViewSubmissionsSerializer(homework_submission)
+        return Response(serializer.data)
         
 class HomeworkCommentCreateView(APIView):
+    pagination_class = CommentKeysetPagination
+
     def get(self, request, *args, **kwargs):
-        user = self.request.user
+        """
+        The homework's comment thread, paginated by CommentKeysetPagination.
+        Authors are resolved per page with one query per profile type.
+        """
+        profile = request.profile
         classroom_id = self.kwargs.get('classroom_id')
         homework_id = self.kwargs.get('homework_id')
 
-        if hasattr(user, 'tutor'):
-            classroom = Classroom.objects.get(id=classroom_id)
-            if classroom.tutor.user != user:
+        classroom = Classroom.objects.filter(id=classroom_id).first()
+        if not classroom:
+            raise exceptions.NotFound("Not found such classroom")
+        if isinstance(profile, Tutor):
+            if classroom.tutor_id != profile.id:
                 raise exceptions.PermissionDenied('You are not a tutor in this classroom')
-            homework = HomeworkClassroomAssign.objects.filter(id=homework_id).first()
-            if not homework:
-                raise exceptions.NotFound("Not found such homework")
-            comments = HomeworkComments.objects.filter(homework_id=homework.id).all()
-            serializer = HomeworkAllCommentSerializer(comments, many=True)
-            return Response(serializer.data)
-        
-        if hasattr(user, 'student'):
-            classroom = Classroom.objects.get(id=classroom_id)
-            student_profile = user.student
-            if student_profile not in classroom.students.all():
+        elif isinstance(profile, Student):
+            if not classroom.students.filter(id=profile.id).exists():
                 raise exceptions.PermissionDenied('You are not a student in this classroom')
-            homework = HomeworkClassroomAssign.objects.filter(id=homework_id).first()
-            if not homework:
-                raise exceptions.NotFound("Not found such homework")
-            comments = HomeworkComments.objects.filter(homework_id=homework.id).all()
-            serializer = HomeworkAllCommentSerializer(comments, many=True)
-            return Response(serializer.data)
+        else:
+            raise exceptions.PermissionDenied('Only tutors and students can read comments')
+
+        homework = HomeworkClassroomAssign.objects.filter(id=homework_id, classroom=classroom).first()
+        if not homework:
+            raise exceptions.NotFound("Not found such homework")
+
+        paginator = self.pagination_class()
+        comments = paginator.paginate_queryset(
+            HomeworkComments.objects.filter(homework_id=homework.id), request, view=self,
+        )
+        prefetch_related_objects(comments, GenericPrefetch('user', [
+            Tutor.objects.select_related('user'),
+            Student.objects.select_related('user'),
+        ]))
+        serializer = HomeworkAllCommentSerializer(comments, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
     def post(self, request, *args, **kwargs):
         classroom_id = self.kwargs.get('classroom_id')
         homework_id = self.kwargs.get('homework_id')
-        user = self.request.user
+        profile = request.profile
 
-        if hasattr(user, 'tutor'):
-            classroom = Classroom.objects.get(id=classroom_id)
-            if classroom.tutor.user != user:
+        if isinstance(profile, Tutor):
+            classroom = Classroom.objects.filter(id=classroom_id).first()
+            if not classroom:
+                raise exceptions.NotFound("Not found such classroom")
+            if classroom.tutor_id != profile.id:
                 raise exceptions.PermissionDenied('You are not a tutor in this classroom')
             homework = HomeworkClassroomAssign.objects.filter(id=homework_id).first()
             if not homework:
@@ -243,14 +496,15 @@ class HomeworkCommentCreateView(APIView):
             tutor_content_type = ContentType.objects.get_for_model(Tutor)
             serializer = HomeworkCommentSerializer(data=request.data)
             serializer.is_valid(raise_exception=True)
-            serializer.save(homework=homework, user_content_type=tutor_content_type, user_object_id=user.id)
+            serializer.save(homework=homework, user_content_type=tutor_content_type, user_object_id=profile.id)
             return Response('commented successfully')
 
             
-        if hasattr(user, 'student'):
-            classroom = Classroom.objects.get(id=classroom_id)
-            student_profile = user.student
-            if student_profile not in classroom.students.all():
+        if isinstance(profile, Student):
+            classroom = Classroom.objects.filter(id=classroom_id).first()
+            if not classroom:
+                raise exceptions.NotFound("Not found such classroom")
+            if not classroom.students.filter(id=profile.id).exists():
                 raise exceptions.PermissionDenied('You are not a student in this classroom')
             
             homework = HomeworkClassroomAssign.objects.filter(id=homework_id).first()
@@ -259,7 +513,7 @@ class HomeworkCommentCreateView(APIView):
             student_content_type = ContentType.objects.get_for_model(Student)
             serializer = HomeworkCommentSerializer(data=request.data)
             serializer.is_valid(raise_exception=True)
-            serializer.save(homework=homework, user_content_type=student_content_type, user_object_id=user.id)
+            serializer.save(homework=homework, user_content_type=student_content_type, user_object_id=profile.id)
             return Response('commented successfully')
         
 # class HomeworkCommentView(APIView):
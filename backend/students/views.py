@@ -21,7 +21,7 @@ class StudentDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        user = self.request.user
+        profile = request.profile
         student_id = self.kwargs.get('student_id')
 
         try:
@@ -29,28 +29,22 @@ class StudentDetailView(APIView):
         except Student.DoesNotExist:
             raise exceptions.NotFound("not found such user")
         
-        try:
-            tutor = Tutor.objects.get(user=user)
+        if isinstance(profile, Tutor):
             try:
-                classroom = Classroom.objects.get(students=student_detail, tutor=tutor)
-
+                classroom = Classroom.objects.get(students=student_detail, tutor=profile)
             except Classroom.DoesNotExist:
                 raise exceptions.NotFound("No such classroom with such tutor and student")
-            
+
             serializer = StudentTutorDetailViewSerializer(student_detail)
             return Response(serializer.data)
 
-        except Tutor.DoesNotExist:
+        if isinstance(profile, Student):
             try:
-                student = Student.objects.get(user=user)
-                try:
-                    classroom = Classroom.objects.filter(students=student).filter(students=student_detail).first()
-                except Classroom.DoesNotExist:
-                    raise exceptions.NotFound("No such classroom where two students exist")
-                
-                serializer = StudentStudentDetailViewSerializer(student_detail)
-                return Response(serializer.data)
-                
-
-            except Student.DoesNotExist:
-                raise exceptions.NotFound("Not found such student or tutor")
+                classroom = Classroom.objects.filter(students=profile).filter(students=student_detail).first()
+            except Classroom.DoesNotExist:
+                raise exceptions.NotFound("No such classroom where two students exist")
+
+            serializer = StudentStudentDetailViewSerializer(student_detail)
+            return Response(serializer.data)
+
+        raise exceptions.NotFound("Not found such student or tutor")
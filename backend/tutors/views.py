@@ -26,7 +26,7 @@ class TutorCheckStudent(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
-        if not Tutor.objects.filter(user=request.user).exists():
+        if not isinstance(request.profile, Tutor):
             return Response(
                 {"error": "You are not a tutor."},
                 status=status.HTTP_403_FORBIDDEN
@@ -68,14 +68,11 @@ class TutorDetailView(APIView):
             raise exceptions.NotFound('such tutor does not exist')
         
         
-        try:
-            student = Student.objects.get(user=user)
-            try:
-                classroom = Classroom.objects.get(students=student, tutor=tutor)
-            except Classroom.DoesNotExist:
-                raise exceptions.PermissionDenied("Must be a student of this classroom to view details")
-        except Student.DoesNotExist:
+        student = request.profile
+        if not isinstance(student, Student):
             raise exceptions.PermissionDenied("Must be a student")
+        if not Classroom.objects.filter(students=student, tutor=tutor).exists():
+            raise exceptions.PermissionDenied("Must be a student of this classroom to view details")
         serializer = TutorDetailViewSerializer(tutor)
         
         return Response(serializer.data)
@@ -83,10 +80,8 @@ class TutorDetailView(APIView):
 class TutorAllStudentsView(APIView):
 
     def get(self, request, *args, **kwargs):
-        user = self.request.user
-        try:
-            tutor = Tutor.objects.get(user=user)
-        except Tutor.DoesNotExist:
+        tutor = request.profile
+        if not isinstance(tutor, Tutor):
             raise exceptions.NotFound("Not found tutor")
         
         try:
@@ -234,7 +234,11 @@ export const api = {
     // List all homeworks (assuming there's a list endpoint)
     list: (token) => api.get("/homeworks/", token),
     // Get homeworks for a specific classroom
-    getByClassroom: (classroomId, token) => api.get(`/homeworks/classroom/${classroomId}/`, token),
+    // Paginated on the backend; unwrap the first page of results
+    getByClassroom: async (classroomId, token, pageSize = 100) => {
+      const result = await api.get(`/homeworks/classroom/${classroomId}/?page_size=${pageSize}`, token)
+      return result?.results ?? result
+    },
     get: (classroomId, homeworkId, token) =>
       api.get(`/homeworks/classroom/${classroomId}/homework/${homeworkId}`, token),
     getById: (homeworkId, token) => api.get(`/homeworks/${homeworkId}/`, token),
@@ -249,8 +253,10 @@ export const api = {
     getSubmissionsList: (classroomId, homeworkId, token) =>
       api.get(`/homeworks/classroom/${classroomId}/homework/${homeworkId}/submissions/`, token),
     // Get comments for a specific homework
-    getComments: (classroomId, homeworkId, token) =>
-      api.get(`/homeworks/classroom/${classroomId}/homework/${homeworkId}/comment/`, token),
+    getComments: async (classroomId, homeworkId, token, pageSize = 200) => {
+      const result = await api.get(`/homeworks/classroom/${classroomId}/homework/${homeworkId}/comment/?page_size=${pageSize}`, token)
+      return result?.results ?? result
+    },
     // Post a new comment on a homework
     postComment: (classroomId, homeworkId, commentData, token) =>
       api.post(`/homeworks/classroom/${classroomId}/homework/${homeworkId}/comment/`, commentData, token, false),
@@ -269,7 +275,8 @@ export const api = {
         console.log(`Loading message history for conversation: ${conversationId}`)
         const result = await api.get(`/conversations/${conversationId}/messages/`, token)
         console.log("Message history API response:", result)
-        return result
+        // History is paginated: the latest page lives in `results`
+        return result?.results ?? result
       } catch (error) {
         console.error("Failed to load message history:", error)
         // Return empty array if history fails to load